@@ -0,0 +1,75 @@
+"""Import time of seller-stats modules, each one measured in a fresh interpreter.
+
+Usage:
+
+    python -m benchmarks.import_time --repeat 5 --output import_time.json
+
+Time of shared heavy dependencies (numpy, pandas) is reported separately from the time spent in the module itself,
+along with the heavy optional dependencies the import pulled in.
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+MODULES = [
+    'seller_stats.category_stats',
+    'seller_stats.batch',
+    'seller_stats.utils.loaders',
+    'seller_stats.category_updates',
+]
+
+BASELINE = 'import numpy, pandas'
+
+HEAVY_DEPENDENCIES = ['boto3', 'botocore', 'scrapinghub', 'requests', 'envparse']
+
+SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - started
+print(json.dumps({{'seconds': seconds, 'loaded': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def measure(statement: str, repeat: int = 5) -> dict:
+    """Best wall time of `statement` in a fresh interpreter out of `repeat` runs."""
+    runs = []
+
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', SCRIPT.format(statement=statement, heavy=HEAVY_DEPENDENCIES)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    return {'seconds': min(run['seconds'] for run in runs), 'loaded': runs[0]['loaded']}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure import time of seller-stats modules.')
+    parser.add_argument('--modules', nargs='+', default=MODULES)
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreter runs per module, the best one is reported')
+    parser.add_argument('--output', default='-', help='JSON file for results, stdout by default')
+    args = parser.parse_args(argv)
+
+    baseline = measure(BASELINE, repeat=args.repeat)['seconds']
+    report = {'baseline_seconds': baseline, 'modules': {}}
+
+    for module in args.modules:
+        result = measure(f'{BASELINE}\nimport {module}', repeat=args.repeat)
+        result['own_seconds'] = max(result['seconds'] - baseline, 0)
+
+        report['modules'][module] = result
+
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+    else:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""End-to-end throughput benchmark on synthetic marketplace data.
+
+Usage:
+
+    python -m benchmarks.run --sizes 10000 100000 1000000 --output benchmark.json
+
+Every stage is timed on its own (best of --repeat runs) and then run once more under tracemalloc to get its peak
+memory. Stats stages drop memoized results before every run, `cache_hits` of such stages should stay 0.
+Results are written as JSON so they can be compared between commits.
+"""
+import argparse
+import datetime
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import requests_mock
+from scrapinghub import ScrapinghubClient
+
+from seller_stats.base import DataSet
+from seller_stats.category_stats import CategoryStats, calc_hhi_batch, calc_sales_distribution
+from seller_stats.category_updates import CategoryListUpdates
+from seller_stats.utils.loaders import CsvLoader, ScrapinghubLoader
+from seller_stats.utils.transformers import (MpstatsWildbserriesTransformer, WildsearchCrawlerOzonTransformer,
+                                             WildsearchCrawlerWildberriesTransformer)
+
+from .synthetic import LAYOUTS, generate_category_lists, generate_items, to_jsonlines
+
+TRANSFORMERS = {
+    'wb': WildsearchCrawlerWildberriesTransformer,
+    'ozon': WildsearchCrawlerOzonTransformer,
+    'mpstats': MpstatsWildbserriesTransformer,
+}
+
+NOW = datetime.datetime(2020, 6, 1)
+
+JOB_ID = '1/1/1'
+
+
+class CategoryDataSet(CategoryStats):
+    """Only the DataSet part of CategoryStats: checks and cleaning without stats."""
+
+    def __init__(self, data):
+        DataSet.__init__(self, data=data)
+
+
+def measure(func, repeat=1, trace_memory=True):
+    timings = []
+
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+
+    peak_memory = None
+    if trace_memory:
+        del result
+        gc.collect()
+
+        tracemalloc.start()
+        result = func()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return result, min(timings), peak_memory
+
+
+def run_layout(layout, size, repeat=1, trace_memory=True, seed=0):
+    transformer = TRANSFORMERS[layout]()
+    items = generate_items(layout=layout, count=size, seed=seed)
+    results = []
+
+    def stage(name, func, rows=size, dataset=None):
+        hits_before = dataset.cache_info()['hits'] if dataset is not None else None
+        result, seconds, peak_memory = measure(func, repeat=repeat, trace_memory=trace_memory)
+
+        results.append({
+            'layout': layout,
+            'size': size,
+            'stage': name,
+            'seconds': seconds,
+            'rows_per_second': rows / seconds if seconds > 0 else None,
+            'peak_memory_bytes': peak_memory,
+            'cache_hits': dataset.cache_info()['hits'] - hits_before if dataset is not None else None,
+        })
+
+        logging.info(f'{layout:>8} {size:>8} {name:<32} {seconds:8.3f}s')
+
+        return result
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, f'{layout}.csv')
+        pd.DataFrame(data=items).to_csv(csv_path, index=False)
+
+        stage('csv_loader.load', lambda: CsvLoader(file_path=csv_path, transformer=transformer).load())
+        frame = stage('csv_loader.load_frame', lambda: CsvLoader(file_path=csv_path, transformer=transformer).load_frame())
+
+    with requests_mock.Mocker() as mocker:
+        mocker.get(f'https://storage.scrapinghub.com/jobs/{JOB_ID}/state', text='"finished"')
+        mocker.get(f'https://storage.scrapinghub.com/items/{JOB_ID}?meta=_key', content=to_jsonlines(items), headers={'Content-Type': 'application/x-jsonlines; charset=UTF-8'})
+
+        client = ScrapinghubClient('dummy_scrapinghub_key')
+
+        stage('scrapinghub_loader.load', lambda: ScrapinghubLoader(job_id=JOB_ID, client=client, transformer=transformer).load())
+        stage('scrapinghub_loader.iter_chunks', lambda: list(ScrapinghubLoader(job_id=JOB_ID, client=client, transformer=transformer).iter_chunks()))
+
+    stage('transformer.transform_item', lambda: [transformer.transform_item(dict(item)) for item in items])
+    raw_frame = pd.DataFrame(data=items)
+    stage('transformer.transform_frame', lambda: transformer.transform_frame(raw_frame))
+
+    stage('dataset.clean', lambda: CategoryDataSet(frame))
+    stats = stage('category_stats', lambda: CategoryStats(frame, now=NOW))
+    # результаты stats мемоизированы, без сброса кэша каждый следующий прогон измерял бы только поиск в нем
+    stage('calc_sales_distribution', lambda: calc_sales_distribution(stats.invalidate()), dataset=stats)
+
+    # calc_hhi по brand_name берет готовые суммы из RunningAggregates, поэтому группировку меряем через calc_hhi_batch
+    if 'brand_name' in stats.df.columns:
+        stage('calc_hhi_batch', lambda: calc_hhi_batch(stats.invalidate(), by=('brand_name',)), dataset=stats)
+
+    return results
+
+
+def run_category_updates(size, repeat=1, trace_memory=True, seed=0):
+    old, new = generate_category_lists(count=size, seed=seed)
+
+    def calculate_diff():
+        updates = CategoryListUpdates(old, new)
+        updates.calculate_diff()
+
+        return updates
+
+    _, seconds, peak_memory = measure(calculate_diff, repeat=repeat, trace_memory=trace_memory)
+    logging.info(f'{"":>8} {size:>8} {"category_list_updates.calculate_diff":<32} {seconds:8.3f}s')
+
+    return [{
+        'layout': 'categories',
+        'size': size,
+        'stage': 'category_list_updates.calculate_diff',
+        'seconds': seconds,
+        'rows_per_second': size / seconds if seconds > 0 else None,
+        'peak_memory_bytes': peak_memory,
+    }]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark seller-stats pipeline stages on synthetic data.')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000, 1000000])
+    parser.add_argument('--layouts', nargs='+', choices=LAYOUTS, default=list(LAYOUTS))
+    parser.add_argument('--repeat', type=int, default=1, help='timing runs per stage, the best one is reported')
+    parser.add_argument('--no-memory', action='store_true', help='skip tracemalloc runs')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='-', help='JSON file for results, stdout by default')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stderr)
+    logging.getLogger('seller_stats').setLevel(logging.WARNING)
+
+    results = []
+    for size in args.sizes:
+        for layout in args.layouts:
+            results += run_layout(layout, size, repeat=args.repeat, trace_memory=not args.no_memory, seed=args.seed)
+
+        results += run_category_updates(size, repeat=args.repeat, trace_memory=not args.no_memory, seed=args.seed)
+
+    report = {
+        'meta': {
+            'created_at': datetime.datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+    else:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Seeded synthetic marketplace items in the raw field layouts of the supported crawlers."""
+import json
+
+import numpy as np
+import pandas as pd
+
+LAYOUTS = ('wb', 'ozon', 'mpstats')
+
+COUNTRIES = ['Россия', 'Китай', 'Турция', 'Германия', 'Италия', 'Беларусь', 'Польша', 'Япония']
+
+
+def generate_frame(layout: str = 'wb', count: int = 10000, seed: int = 0, categories: int = 1) -> pd.DataFrame:
+    """Generate `count` raw items for `layout` as a DataFrame of strings and numbers, like crawlers give them."""
+    if layout not in LAYOUTS:
+        raise ValueError(f'Unknown layout {layout}, use one of: ' + ', '.join(LAYOUTS))
+
+    rng = np.random.default_rng(seed)
+
+    ids = rng.choice(np.arange(1000000, 1000000 + count * 10), size=count, replace=False)
+    prices = np.round(rng.lognormal(mean=6.5, sigma=1.0, size=count)).astype('int64')
+    purchases = rng.zipf(1.8, size=count).clip(max=100000)
+    reviews = (purchases * rng.uniform(0, .2, size=count)).astype('int64')
+    ratings = rng.integers(0, 6, size=count)
+    positions = np.arange(1, count + 1) % 5000 + 1
+    brands = np.array([f'Бренд {number}' for number in range(max(count // 20, 1))])[rng.zipf(1.5, size=count).clip(max=max(count // 20, 1)) - 1]
+    category_numbers = rng.integers(0, categories, size=count)
+    first_reviews = pd.Timestamp('2020-06-01') - pd.to_timedelta(rng.integers(1, 1500, size=count), unit='D')
+    countries = np.array(COUNTRIES)[rng.integers(0, len(COUNTRIES), size=count)]
+
+    urls = [f'https://www.wildberries.ru/catalog/{_id}/detail.aspx' for _id in ids]
+    names = [f'Товар {_id}' for _id in ids]
+    category_names = [f'Категория {number}' for number in category_numbers]
+    category_urls = [f'https://www.wildberries.ru/catalog/category-{number}' for number in category_numbers]
+
+    if layout == 'wb':
+        df = pd.DataFrame(data={
+            '_type': 'WildsearchCrawlerItemWildberries',
+            'marketplace': 'wildberries',
+            'parse_date': '2020-06-01 12:00:00.000000',
+            'product_name': names,
+            'product_url': urls,
+            'wb_id': ids.astype('str'),
+            'wb_price': prices.astype('str'),
+            'wb_category_position': positions,
+            'wb_purchases_count': purchases.astype('str'),
+            'wb_rating': ratings.astype('str'),
+            'wb_reviews_count': reviews.astype('str'),
+            'wb_category_url': category_urls,
+            'wb_category_name': category_names,
+            'wb_brand_name': brands,
+            'wb_brand_country': countries,
+            'wb_manufacture_country': countries[::-1],
+            'wb_first_review_date': first_reviews.strftime('%Y-%m-%dT%H:%M:%S+03:00'),
+        })
+
+        # как и у настоящего краулера, часть товаров приходит без цены и без отзывов
+        df.loc[rng.random(count) < .01, 'wb_price'] = ''
+        df.loc[reviews == 0, 'wb_first_review_date'] = 'NaT'
+
+        return df
+
+    if layout == 'ozon':
+        df = pd.DataFrame(data={
+            '_type': 'dict',
+            'marketplace': 'ozon',
+            'parse_date': '2020-06-01 12:00:00.000000',
+            'product_name': names,
+            'product_url': [f'/context/detail/id/{_id}/' for _id in ids],
+            'ozon_id': ids,
+            'ozon_price': prices,
+            'ozon_rating': ratings.astype('float'),
+            'ozon_reviews_count': reviews.astype('float'),
+            'ozon_category_position': positions,
+            'ozon_category_url': category_urls,
+            'ozon_category_name': category_names,
+            'ozon_brand_name': brands,
+            'ozon_first_review_date': first_reviews.strftime('%Y-%m-%d'),
+        })
+
+        df.loc[reviews == 0, ['ozon_rating', 'ozon_reviews_count', 'ozon_first_review_date']] = None
+
+        return df
+
+    return pd.DataFrame(data={
+        'id': ids,
+        'name': names,
+        'brand': brands,
+        'seller': [f'ООО Продавец {number}' for number in rng.integers(0, max(count // 50, 1), size=count)],
+        'category': category_names,
+        'category_position': positions,
+        'comments': reviews,
+        'rating': ratings,
+        'final_price': prices,
+        'sales': purchases,
+        'url': urls,
+    })
+
+
+def generate_items(layout: str = 'wb', count: int = 10000, seed: int = 0, categories: int = 1) -> list:
+    df = generate_frame(layout=layout, count=count, seed=seed, categories=categories)
+
+    return [{key: value for key, value in item.items() if value is not None and value == value} for item in df.to_dict(orient='records')]
+
+
+def to_jsonlines(items: list) -> bytes:
+    """Serialize items the way Scrapinghub storage streams them."""
+    return '\n'.join(json.dumps(item, ensure_ascii=False, default=int) for item in items).encode('utf-8')
+
+
+def generate_category_lists(count: int = 10000, changed_share: float = .1, seed: int = 0):
+    """Old and new category lists where `changed_share` of categories were removed and as many added."""
+    rng = np.random.default_rng(seed)
+    changed = int(count * changed_share)
+
+    numbers = rng.permutation(count + changed)
+    old = [{'category_name': f'Категория {number // 3}', 'category_url': f'https://www.wildberries.ru/catalog/category-{number}'} for number in numbers[:count]]
+    new = old[changed:] + [{'category_name': f'Категория {number // 3}', 'category_url': f'https://www.wildberries.ru/catalog/category-{number}'} for number in numbers[count:]]
+
+    return old, new
@@ -1,38 +1,110 @@
 import logging
+from collections.abc import Iterator
 
 import numpy as np
 import pandas as pd
 
+from .utils.instrumentation import Instrumentation, instrumented
+from .utils.memoize import FrameFingerprint, ResultCache
+
 logger = logging.getLogger(__name__)
 
 
 class DataSet:
     fields_required = ()
+    fields_optional = ()
     fields_force_from_empty_string_to_nan = ()
     fields_force_zeros_to_nan = ()
     fields_drop_empty_strings = ()
     fields_drop_na = ()
     fields_force_types = {}
 
-    def __init__(self, data):
+    # компактный режим: повторяющиеся строки храним как категории, числа ужимаем там, где это ничего не меняет
+    fields_compact_categories = ()
+    fields_compact_downcast = ()
+    compact = False
+    # наследники, которые считают производные колонки, ужимают кадр сами, когда эти колонки готовы
+    compact_on_load = True
+
+    def __init__(self, data, compact: bool = None, instrumentation: Instrumentation = None):
         self.meta = {}
-        self.df = pd.DataFrame(data=data)
+        self.instrumentation = instrumentation
+        self.results = ResultCache()
+        self.version = 0
+
+        if instrumentation is not None:
+            self.meta['timings'] = instrumentation.records
+
+        if compact is not None:
+            self.compact = compact
 
         pd.set_option('display.precision', 2)
         pd.set_option('chop_threshold', 0.01)
         pd.options.display.float_format = '{:.2f}'.format
 
         self.meta['loaded_data'] = {
-            'count_raw': len(data),
+            'count_raw': 0,
             'count_removed': 0,
             'count_clean': 0,
+            'count_removed_by_rule': {},
             'errors': [],
             'warnings': [],
         }
 
-        self._check_dataframe()
-        self._clean_dataframe()
+        if isinstance(data, Iterator):
+            self._load_chunks(data)
+        else:
+            self.df = to_frame(data)
+            self.meta['loaded_data']['count_raw'] = len(self.df.index)
+
+            self._check_dataframe()
+            self._clean_dataframe()
+
+        if self.compact and self.compact_on_load:
+            self._compact_dataframe()
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self._df
+
+    @df.setter
+    def df(self, df: pd.DataFrame):
+        self._df = df
+        self.invalidate()
+
+    def invalidate(self):
+        """Drop cached derived results, needed only after changing values of the frame in place."""
+        self.version = getattr(self, 'version', 0) + 1
+
+        return self
+
+    def fingerprint(self) -> FrameFingerprint:
+        return FrameFingerprint(self._df, self.version)
+
+    def cache_info(self) -> dict:
+        """Hits, misses and size of the derived results cache."""
+        return self.results.info()
+
+    def _load_chunks(self, chunks):
+        """Check and clean every chunk on its own, so dropped rows never pile up in memory."""
+        clean_chunks = []
 
+        for chunk in chunks:
+            self.df = to_frame(chunk)
+            self.meta['loaded_data']['count_raw'] += len(self.df.index)
+
+            self._check_dataframe()
+            self._clean_dataframe()
+
+            clean_chunks.append(self.df)
+
+        if len(clean_chunks) == 0:
+            self.df = pd.DataFrame()
+            self._check_dataframe()
+        else:
+            self.df = pd.concat(clean_chunks, ignore_index=True)
+
+    @instrumented('check_dataframe')
     def _check_dataframe(self):
         not_found = []
 
@@ -43,31 +115,131 @@ class DataSet:
 
         if len(not_found) > 0:
             message = 'Required fields not found: ' + ', '.join(not_found)
+
+            # при загрузке по частям одно и то же предупреждение не дублируем
+            if message in self.meta['loaded_data']['warnings']:
+                return
+
             self.meta['loaded_data']['warnings'].append(message)
             logger.warning(message)
 
+    @classmethod
+    def cleaning_plan(cls):
+        """Cleaning plan compiled once per DataSet subclass."""
+        if '_cleaning_plan' not in cls.__dict__:
+            cls._cleaning_plan = CleaningPlan(cls)
+
+        return cls._cleaning_plan
+
+    @instrumented('clean_dataframe')
     def _clean_dataframe(self):
         len_raw = len(self.df.index)
 
-        # если уж найдем пустые значения, то изгоним их каленым железом (вместе со всей строкой, да)
-        for field in self.fields_drop_empty_strings:
-            self.df.drop(self.df[self.df[field] == ''].index, inplace=True)
+        self.df, removed_by_rule = self.cleaning_plan().apply(self.df)
 
-        # делаем пустые значения действительно пустыми
-        for field in self.fields_force_from_empty_string_to_nan:
-            self.df[field].replace('', np.nan, inplace=True)
+        len_clean = len(self.df.index)
 
-        for field in self.fields_force_zeros_to_nan:
-            self.df[field].replace(0, np.nan, inplace=True)
+        self.meta['loaded_data']['count_removed'] += len_raw - len_clean
+        self.meta['loaded_data']['count_clean'] += len_clean
 
-        self.df.dropna(subset=self.fields_drop_na, inplace=True)
+        for rule, count in removed_by_rule.items():
+            self.meta['loaded_data']['count_removed_by_rule'][rule] = self.meta['loaded_data']['count_removed_by_rule'].get(rule, 0) + count
 
-        for field, field_type in self.fields_force_types.items():
-            self.df[field] = self.df[field].astype(field_type)
+        return self
 
-        len_clean = len(self.df.index)
+    def _compact_dataframe(self):
+        bytes_before = int(self.df.memory_usage(deep=True).sum())
+
+        for field in self.fields_compact_categories:
+            # категории выгодны только тогда, когда значения действительно повторяются
+            if field in self.df.columns and self.df[field].nunique() <= len(self.df.index) / 2:
+                self.df[field] = self.df[field].astype('category')
+
+        for field in self.fields_compact_downcast:
+            if field in self.df.columns:
+                self.df[field] = downcast(self.df[field])
 
-        self.meta['loaded_data']['count_removed'] = len_raw - len_clean
-        self.meta['loaded_data']['count_clean'] = len_clean
+        self.invalidate()
+
+        self.meta['memory'] = {
+            'bytes_before': bytes_before,
+            'bytes_after': int(self.df.memory_usage(deep=True).sum()),
+        }
 
         return self
+
+
+def to_frame(data) -> pd.DataFrame:
+    """DataFrame over the data without copying what can be shared.
+
+    Arrow tables and record batches are converted column by column without block consolidation, DataFrames are only
+    shallow-copied, so cleaning never touches the caller's frame.
+    """
+    if isinstance(data, pd.DataFrame):
+        return data.copy(deep=False)
+
+    if hasattr(data, 'to_pandas') and hasattr(data, 'num_rows'):
+        return data.to_pandas(split_blocks=True)
+
+    return pd.DataFrame(data=data)
+
+
+def downcast(series: pd.Series) -> pd.Series:
+    """Shrink numeric series to the smallest type that keeps every value intact."""
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return pd.to_numeric(series, downcast='integer')
+
+    if series.dtype == 'float64':
+        downcasted = series.astype('float32')
+
+        if np.array_equal(downcasted.to_numpy(dtype='float64'), series.to_numpy(), equal_nan=True):
+            return downcasted
+
+    return series
+
+
+class CleaningPlan:
+    """All cleaning steps of a DataSet subclass, built from its fields_* attributes.
+
+    Rows are dropped with one combined boolean mask and the touched columns are replaced and cast in one batch,
+    so the frame is copied at most twice whatever the number of fields.
+    """
+
+    def __init__(self, dataset):
+        self.drop_rules = [('drop_empty_strings', field) for field in dataset.fields_drop_empty_strings]
+        self.drop_rules += [('drop_na', field) for field in dataset.fields_drop_na]
+
+        # делаем пустые значения действительно пустыми
+        self.replacements = {}
+
+        for field in dataset.fields_force_from_empty_string_to_nan:
+            self.replacements.setdefault(field, {})[''] = np.nan
+
+        for field in dataset.fields_force_zeros_to_nan:
+            self.replacements.setdefault(field, {})[0] = np.nan
+
+        self.types = dict(dataset.fields_force_types)
+        self.columns = list(dict.fromkeys(list(self.replacements.keys()) + list(self.types.keys())))
+
+    def apply(self, df):
+        """Return cleaned frame and number of rows removed by each rule (a row is counted by the first rule it hit)."""
+        keep = np.ones(len(df.index), dtype=bool)
+        removed_by_rule = {}
+
+        for rule, field in self.drop_rules:
+            if rule == 'drop_empty_strings':
+                matched = (df[field] == '').to_numpy()
+            else:
+                # значения, которые станут пустыми после замен, тоже считаются пустыми
+                matched = (df[field].isna() | df[field].isin(list(self.replacements.get(field, {}).keys()))).to_numpy()
+
+            removed_by_rule[f'{rule}:{field}'] = int((matched & keep).sum())
+            keep &= ~matched
+
+        if not keep.all():
+            df = df.take(np.flatnonzero(keep))
+
+        if len(self.columns) > 0:
+            df[self.columns] = df[self.columns].replace(self.replacements).astype(self.types)
+
+        return df, removed_by_rule
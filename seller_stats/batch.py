@@ -0,0 +1,131 @@
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import NamedTuple
+
+import pandas as pd
+
+from .category_stats import CategoryStats, calc_hhi_batch, calc_sales_distribution
+from .utils.loaders import CsvLoader, ScrapinghubLoader
+from .utils.transformers import Transformer
+
+logger = logging.getLogger(__name__)
+
+JOB_ID_PATTERN = re.compile(r'^\d+/\d+/\d+$')
+
+
+class BatchResult(NamedTuple):
+    """Summary of one source. Failed sources keep None in every metric, so they don't count as empty categories."""
+
+    source: str
+    category_name: str = None
+    category_url: str = None
+    count_raw: int = None
+    count_clean: int = None
+    sku: int = None
+    turnover_month: float = None
+    purchases_month: float = None
+    hhi: dict = None
+    distribution: dict = None
+    error: str = None
+    warnings: tuple = ()
+
+
+def get_loader(source: str, transformer: Transformer = None):
+    """Scrapinghub job for job ids like 123/4/5, CSV file for everything else."""
+    if JOB_ID_PATTERN.match(source):
+        return ScrapinghubLoader(job_id=source, transformer=transformer)
+
+    return CsvLoader(file_path=source, transformer=transformer)
+
+
+def process_source(source: str, transformer: Transformer = None, hhi_by=('brand_name',), now: datetime = None) -> BatchResult:
+    """Build CategoryStats for one source and squeeze it into a compact result. Any failure is returned, not raised."""
+    try:
+        loader = get_loader(source, transformer=transformer)
+
+        if isinstance(loader, CsvLoader):
+            fields = list(CategoryStats.fields_required) + list(CategoryStats.fields_optional)
+            data = loader.load_frame(dataset=CategoryStats, usecols=fields + [field for field in hhi_by if field not in fields])
+        else:
+            data = loader.iter_chunks()
+
+        stats = CategoryStats(data, now=now)
+        distribution = calc_sales_distribution(stats)
+
+        # запрошенные, но отсутствующие в данных измерения не теряем молча, а отмечаем в результате
+        missing = [field for field in hhi_by if field not in stats.df.columns]
+        hhi = calc_hhi_batch(stats, by=[field for field in hhi_by if field not in missing])
+        hhi.update(dict.fromkeys(missing))
+    except Exception as error:  # noqa: B902
+        logger.exception(f'Failed to process {source}')
+
+        return BatchResult(source=source, error=f'{type(error).__name__}: {error}')
+
+    return BatchResult(
+        source=source,
+        category_name=stats.category_name(),
+        category_url=stats.category_url(),
+        count_raw=stats.meta['loaded_data']['count_raw'],
+        count_clean=stats.meta['loaded_data']['count_clean'],
+        sku=int(stats.df.sku.sum()),
+        turnover_month=float(stats.df.turnover_month.sum()),
+        purchases_month=float(stats.df.purchases_month.sum()),
+        hhi={field: None if value is None else float(value) for field, value in hhi.items()},
+        distribution=distribution.df.loc[:, ['bin_labels', 'sku', 'turnover_month', 'purchases_month']].to_dict(orient='list'),
+        warnings=tuple(f'HHI field not found: {field}' for field in missing),
+    )
+
+
+def iter_batch(sources, transformer: Transformer = None, workers: int = None, hhi_by=('brand_name',), now: datetime = None):
+    """Process sources on a pool of `workers` processes (all cores by default), yielding results as they are ready.
+
+    With workers=1 everything runs in the current process.
+    """
+    if workers == 1:
+        for source in sources:
+            yield process_source(source, transformer=transformer, hhi_by=hhi_by, now=now)
+
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(process_source, source, transformer, hhi_by, now) for source in sources]
+
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def run_batch(sources, transformer: Transformer = None, workers: int = None, hhi_by=('brand_name',), now: datetime = None) -> list:
+    """Process sources on a pool of processes and return results in the order of sources."""
+    sources = list(sources)
+    results = {}
+
+    for result in iter_batch(sources, transformer=transformer, workers=workers, hhi_by=hhi_by, now=now):
+        results[result.source] = result
+
+    failed = [result for result in results.values() if result.error is not None]
+    logger.info(f'Processed {len(results)} sources, {len(failed)} failed')
+
+    return [results[source] for source in sources]
+
+
+def results_to_frame(results) -> pd.DataFrame:
+    """One row per source: summary columns, hhi_<field> columns and list columns with the sales distribution."""
+    rows = []
+
+    for result in results:
+        row = result._asdict()
+        hhi = row.pop('hhi') or {}
+        distribution = row.pop('distribution') or {}
+        row['warnings'] = list(row['warnings'])
+
+        row.update({f'hhi_{field}': value for field, value in hhi.items()})
+        row.update({
+            f'distribution_{key}': distribution.get(key)
+            for key in ['bin_labels', 'sku', 'turnover_month', 'purchases_month']
+        })
+
+        rows.append(row)
+
+    return pd.DataFrame(rows)
@@ -1,11 +1,15 @@
 import logging
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
 from .base import DataSet
 from .exceptions import BadDataSet
-from .utils.stats import get_distribution_thresholds
+from .utils.instrumentation import Instrumentation, instrumented
+from .utils.memoize import memoized
+from .utils.stats import (get_distribution_batch_sizes, get_distribution_thresholds,
+                          get_distribution_thresholds_for_batch_size)
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +25,17 @@ class CategoryStats(DataSet):
         'first_review',
     )
 
+    fields_optional = (
+        'name',
+        'url',
+        'turnover',
+        'category_name',
+        'category_url',
+        'brand_name',
+        'brand_country',
+        'manufacture_country',
+    )
+
     fields_force_from_empty_string_to_nan = ('position', 'price', 'purchases', 'rating', 'reviews')
     fields_force_zeros_to_nan = ['reviews']
     fields_force_types = {
@@ -31,8 +46,27 @@ class CategoryStats(DataSet):
         'reviews': 'float',
     }
 
-    def __init__(self, data):
-        super().__init__(data=data)
+    fields_compact_categories = (
+        'name',
+        'url',
+        'category_name',
+        'category_url',
+        'brand_name',
+        'brand_country',
+        'manufacture_country',
+    )
+    fields_compact_downcast = ('position', 'price', 'purchases', 'rating', 'reviews')
+    # оборот считаем до сжатия, иначе произведение float32 теряет точность
+    compact_on_load = False
+
+    # по этим полям держим накопленный оборот для быстрого пересчета HHI
+    aggregates_by = ('brand_name',)
+
+    def __init__(self, data, now: datetime = None, compact: bool = None, instrumentation: Instrumentation = None):
+        super().__init__(data=data, compact=compact, instrumentation=instrumentation)
+
+        # момент, от которого считаем дни с первого отзыва; если не передан, то берем текущий
+        self.now = now
 
         if len(self.df.index) < 1:
             raise BadDataSet('Zero length datasets not allowed for CategoryStats')
@@ -40,51 +74,150 @@ class CategoryStats(DataSet):
         self.calculate_basic_stats()
         self.calculate_monthly_stats()
 
+        if self.compact:
+            self._compact_dataframe()
+            self.set_aggregates(self.aggregates)
+
+    @instrumented('calculate_basic_stats')
     def calculate_basic_stats(self):
         self.df['sku'] = 1
 
         if 'turnover' not in list(self.df.columns):
             self.df['turnover'] = self.df['price'] * self.df['purchases']
 
+        self.invalidate()
+
         logger.info('Basic stats calculated')
 
         return self
 
-    def calculate_monthly_stats(self):
+    @instrumented('calculate_monthly_stats')
+    def calculate_monthly_stats(self, now: datetime = None):
         if 'turnover' not in list(self.df.columns):
             self.calculate_basic_stats()
 
-        # сделаем отдельный датафрейм с отзывами
-        df_reviews = self.df.loc[:, ['id', 'first_review', 'turnover', 'purchases']]
-        df_reviews = df_reviews[
-            df_reviews['first_review'].str.len() != 3]  # почему-то определение NaT как NaN не работает
-        df_reviews.loc[:, 'first_review'] = pd.to_datetime(df_reviews.loc[:, 'first_review'], utc=True)
-        df_reviews.loc[:, 'days_since_first_review'] = (pd.to_datetime(datetime.now(), utc=True) - df_reviews.loc[:, 'first_review']).dt.days
+        now = pd.to_datetime(now or self.now or datetime.now(), utc=True)
+
+        # каждую уникальную дату разбираем только один раз, пустые значения получают код -1
+        codes, first_reviews = pd.factorize(self.df['first_review'])
+        first_reviews = pd.to_datetime(pd.Series(first_reviews, dtype='object'), utc=True, errors='coerce')
+
+        # последний элемент массива – NaN для пустых значений с кодом -1
+        days = np.append((now - first_reviews).dt.days.to_numpy(dtype='float'), np.nan)[codes]
 
         # отсеиваем те товары, где первый отзыв был сделан менее 30 дней назад
-        df_reviews = df_reviews[df_reviews['days_since_first_review'] > 30]
+        days[~(days > 30)] = np.nan
 
-        # и добавим в него данные по обороту и заказам по месяцам
-        df_reviews['turnover_month'] = df_reviews['turnover'] / df_reviews['days_since_first_review'] * 30
-        df_reviews['purchases_month'] = df_reviews['purchases'] / df_reviews[
-            'days_since_first_review'] * 30
+        # и добавим данные по обороту и заказам по месяцам
+        self.df['days_since_first_review'] = days
+        self.df['turnover_month'] = self.df['turnover'] / days * 30
+        self.df['purchases_month'] = self.df['purchases'] / days * 30
 
-        # соеденим все обратно в основной датафрейм
-        self.df = self.df.merge(
-            df_reviews.loc[:, ['id', 'days_since_first_review', 'turnover_month', 'purchases_month']],
-            on='id', how='left')
+        self.invalidate()
+        self.set_aggregates(RunningAggregates(self.df, by=self.aggregates_by))
 
         logger.info('Monthly stats calculated')
 
         return self
 
+    def upsert(self, data):
+        """Add new items and replace already known ones matched by id.
+
+        Only the passed items are cleaned and get monthly stats, running aggregates are corrected by the changed rows.
+        """
+        update = type(self)(data, now=self.now, compact=self.compact, instrumentation=self.instrumentation)
+        update.df = update.df.drop_duplicates(subset='id', keep='last')
+
+        replaced = self.df['id'].isin(update.df['id'])
+
+        aggregates = self.get_aggregates()
+        aggregates.remove(self.df[replaced])
+        aggregates.add(update.df)
+
+        self.df = pd.concat([self.df[~replaced], update.df], ignore_index=True)
+
+        if self.compact:
+            self._compact_dataframe()
+
+        self.set_aggregates(aggregates)
+
+        logger.info(f'Upserted {len(update.df.index)} items, {replaced.sum()} of them replaced')
+
+        return self
+
+    def append(self, data):
+        """Add new items without looking for already known ids."""
+        update = type(self)(data, now=self.now, compact=self.compact, instrumentation=self.instrumentation)
+
+        aggregates = self.get_aggregates().add(update.df)
+
+        self.df = pd.concat([self.df, update.df], ignore_index=True)
+
+        if self.compact:
+            self._compact_dataframe()
+
+        self.set_aggregates(aggregates)
+
+        logger.info(f'Appended {len(update.df.index)} items')
+
+        return self
+
+    def set_aggregates(self, aggregates):
+        """Remember running aggregates as valid for the current frame."""
+        self.aggregates = aggregates
+        self.aggregates_fingerprint = self.fingerprint()
+
+        return self
+
+    def get_aggregates(self):
+        """Running aggregates of the current frame, rebuilt if the frame was changed since they were calculated."""
+        if getattr(self, 'aggregates', None) is None or self.aggregates_fingerprint != self.fingerprint():
+            self.set_aggregates(RunningAggregates(self.df, by=self.aggregates_by))
+
+        return self.aggregates
+
+    @memoized
     def category_name(self) -> str:
         return self.df.loc[0, 'category_name'] if 'category_name' in self.df.columns else 'Неизвестная категория'
 
+    @memoized
     def category_url(self) -> str:
         return self.df.loc[0, 'category_url'] if 'category_url' in self.df.columns else '–'
 
 
+class RunningAggregates:
+    """Running sums over CategoryStats rows, corrected by added and removed rows instead of full rescans."""
+
+    fields = ('sku', 'turnover', 'purchases', 'turnover_month', 'purchases_month')
+
+    def __init__(self, df=None, by=()):
+        self.by = tuple(by)
+        self.sums = dict.fromkeys(self.fields, 0.0)
+        self.groups = {}
+
+        if df is not None:
+            self.add(df)
+
+    def add(self, df):
+        return self._update(df, sign=1)
+
+    def remove(self, df):
+        return self._update(df, sign=-1)
+
+    def _update(self, df, sign):
+        for field in self.fields:
+            self.sums[field] += sign * df[field].sum()
+
+        for field in self.by:
+            if field not in df.columns:
+                continue
+
+            delta = df.groupby(by=field, observed=True)['turnover_month'].sum() * sign
+            self.groups[field] = delta if field not in self.groups else self.groups[field].add(delta, fill_value=0)
+
+        return self
+
+
 class CategorySliceStats(DataSet):
     pass
 
@@ -93,11 +226,12 @@ class SalesDistributions(DataSet):
     fields_required = ('bin', 'sku', 'turnover_month', 'purchases_month')
 
 
+@memoized
 def calc_sales_distribution(stats: CategoryStats) -> SalesDistributions:
     thresholds, labels = get_distribution_thresholds(stats.df.price)
 
-    stats.df['bin'] = pd.cut(stats.df.price, thresholds, include_lowest=True, right=False)
-    data = stats.df.loc[:, ['bin', 'sku', 'turnover_month', 'purchases_month']].groupby(by='bin').sum().reset_index()
+    bins = pd.cut(stats.df.price, thresholds, include_lowest=True, right=False).rename('bin')
+    data = stats.df.loc[:, ['sku', 'turnover_month', 'purchases_month']].groupby(by=bins).sum().reset_index()
     data['bin_labels'] = labels
 
     logger.info('Price distributions calculated')
@@ -105,11 +239,127 @@ def calc_sales_distribution(stats: CategoryStats) -> SalesDistributions:
     return SalesDistributions(data=data)
 
 
+def calc_sales_distributions(df: pd.DataFrame, by='category_name', batches=6, variants=None) -> SalesDistributions:
+    """Calculate price distributions for every category of the frame in one pass.
+
+    Thresholds are chosen per category the same way as in calc_sales_distribution, then all prices are binned
+    arithmetically (bins are equal-width) and summed up with a flat bincount over (category, bin).
+    """
+    fields = ['sku', 'turnover_month', 'purchases_month']
+
+    category_codes, categories = pd.factorize(df[by])
+    price = df['price'].to_numpy(dtype='float')
+
+    # ни у одной строки нет категории, распределять нечего
+    if len(categories) == 0:
+        logger.info('Price distributions calculated for 0 categories')
+
+        return SalesDistributions(data=pd.DataFrame(data={
+            by: pd.Series(dtype='object'),
+            'bin': pd.arrays.IntervalArray.from_arrays([], [], closed='left'),
+            'sku': pd.Series(dtype='int64'),
+            'turnover_month': pd.Series(dtype='float'),
+            'purchases_month': pd.Series(dtype='float'),
+            'bin_labels': pd.Series(dtype='object'),
+        }))
+
+    in_category = category_codes >= 0
+    percentiles = pd.Series(price[in_category]).groupby(category_codes[in_category]).quantile(.95)
+    batch_sizes = get_distribution_batch_sizes(percentiles.reindex(range(len(categories))), batches=batches, variants=variants)
+
+    # для каждой строки определяем номер интервала; последний интервал открыт справа
+    with np.errstate(invalid='ignore'):
+        row_batch_sizes = batch_sizes[category_codes]
+        row_bins = np.minimum(np.floor(price / row_batch_sizes), batches - 1)
+
+    valid = in_category & (price >= 0)
+    keys = category_codes[valid] * batches + row_bins[valid].astype('int64')
+    sums = {}
+
+    for field in fields:
+        weights = np.nan_to_num(df[field].to_numpy(dtype='float')[valid])
+        sums[field] = np.bincount(keys, weights=weights, minlength=len(categories) * batches)
+
+    bin_numbers = np.tile(np.arange(batches), len(categories))
+    bin_sizes = np.repeat(batch_sizes, batches).astype('float')
+    left = bin_sizes * bin_numbers
+    right = np.where(bin_numbers == batches - 1, np.inf, left + bin_sizes)
+
+    # подписи одинаковы для всех категорий с одинаковым шагом, так что строим их только для уникальных шагов
+    labels = {size: get_distribution_thresholds_for_batch_size(size, batches=batches)[1] for size in np.unique(batch_sizes)}
+
+    data = pd.DataFrame(data={
+        by: np.repeat(categories, batches),
+        'bin': pd.arrays.IntervalArray.from_arrays(left, right, closed='left'),
+        'sku': sums['sku'].astype('int64'),
+        'turnover_month': sums['turnover_month'],
+        'purchases_month': sums['purchases_month'],
+        'bin_labels': [label for size in batch_sizes for label in labels[size]],
+    })
+
+    logger.info(f'Price distributions calculated for {len(categories)} categories')
+
+    return SalesDistributions(data=data)
+
+
+@memoized
 def calc_hhi(stats: CategoryStats, by='brand'):
-    total_market = stats.df.turnover_month.sum()
+    if by not in getattr(stats, 'aggregates_by', ()):
+        return calc_hhi_batch(stats, by=(by,))[by]
+
+    # оборот по группам уже накоплен, повторно по всему датафрейму не проходим
+    aggregates = stats.get_aggregates()
+
+    if by not in aggregates.groups:
+        return calc_hhi_batch(stats, by=(by,))[by]
+
+    total_market = aggregates.sums['turnover_month']
+    df_groups = aggregates.groups[by].to_frame(name='turnover_month')
 
-    df_groups = stats.df.loc[:, [by, 'turnover_month']].groupby(by=by).sum()
     df_groups['share'] = df_groups.turnover_month / total_market * 100
     df_groups['sq_share'] = df_groups.share * df_groups.share
 
     return df_groups.sq_share.sum()
+
+
+@memoized
+def calc_hhi_batch(stats: CategoryStats, by=('brand',), group_by=None):
+    """Calculate HHI for several dimensions at once, optionally for every value of `group_by` (i.e. category_name).
+
+    All dimensions share the group codes. Turnover is summed up over (group, value) pairs that actually occur and
+    squared shares are summed per group, so memory grows with rows rather than with groups × values.
+    Returns {dimension: hhi} without `group_by` or a DataFrame indexed by group values with a column per dimension.
+    """
+    turnover = np.nan_to_num(stats.df['turnover_month'].to_numpy(dtype='float'))
+
+    if group_by is None:
+        group_codes, groups = np.zeros(len(turnover), dtype='int64'), [None]
+    else:
+        group_codes, groups = pd.factorize(stats.df[group_by])
+
+    # строки без группы не участвуют вообще, а строки без значения измерения учитываются только в объеме рынка
+    in_group = group_codes >= 0
+    total_market = np.bincount(group_codes[in_group], weights=turnover[in_group], minlength=len(groups))
+
+    hhi = {}
+
+    for field in by:
+        codes, uniques = pd.factorize(stats.df[field])
+        valid = in_group & (codes >= 0)
+
+        # суммируем только встречающиеся пары (группа, значение), а не все группы × все значения
+        pair_codes, pairs = pd.factorize(group_codes[valid] * len(uniques) + codes[valid])
+        pair_turnover = np.bincount(pair_codes, weights=turnover[valid], minlength=len(pairs))
+        pair_groups = pairs // max(len(uniques), 1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shares = pair_turnover / total_market[pair_groups] * 100
+
+        # группы с нулевым объемом рынка дают 0/0, их доли не учитываем
+        squares = np.where(np.isnan(shares), 0, shares * shares)
+        hhi[field] = np.bincount(pair_groups, weights=squares, minlength=len(groups))
+
+    if group_by is None:
+        return {field: values[0] for field, values in hhi.items()}
+
+    return pd.DataFrame(data=hhi, index=pd.Index(groups, name=group_by), columns=list(by))
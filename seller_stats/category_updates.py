@@ -1,19 +1,29 @@
 # На данный момент фича заморожена
-import os
-import tempfile
+import io
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from urllib.parse import quote, urlencode, urlunparse
 
-import boto3
+import numpy as np
 import pandas as pd
-from envparse import env
 
-# инициализируем S3
-s3 = boto3.client('s3')
+from .utils.categories import CATEGORY_TYPE_DEFAULT, CATEGORY_TYPE_RULES, get_category_search_urls, get_category_types
+
+
+@lru_cache(maxsize=None)
+def get_s3_client():
+    """S3 client created on first upload, so importing the module needs neither boto3 nor AWS configuration."""
+    import boto3
+
+    return boto3.client('s3')
 
 
 class CategoryListUpdates:
     _columns = ['category_name', 'category_url']
     _types = ['added', 'removed', 'full']
+    category_type_rules = CATEGORY_TYPE_RULES
+    export_formats = ['csv', 'parquet', 'xlsx']
 
     def fill_types_with(self, value):
         skeleton = {}
@@ -34,120 +44,151 @@ class CategoryListUpdates:
         ))
 
     def generate_category_type(self, category_url):
-        if '/catalog/novinki/' in category_url:
-            return 'Новинки'
-
-        if '/promotions/' in category_url:
-            return 'Промо'
+        for substring, _type in self.category_type_rules:
+            if substring in category_url:
+                return _type
 
-        return 'Обычная'
+        return CATEGORY_TYPE_DEFAULT
 
-    def __init__(self, old, new):
-        self.categories_old = old
-        self.categories_new = new
+    def __init__(self, old=None, new=None):
+        self.categories_old = old if old is not None else []
+        self.categories_new = new if new is not None else []
 
         self.diff = self.fill_types_with(pd.DataFrame())
         self.diff_unique = self.fill_types_with(pd.DataFrame())
         self.s3_files = self.fill_types_with(None)
 
-    def load_from_api(self, client, project):
-        """Export last two scraped WB categories for comparison."""
-        jobs_summary = project.jobs.iter(has_tag=['daily_categories'], state='finished', count=2)
+    def load_from_api(self, client, project, store=None):
+        """
+        Export last two scraped WB categories for comparison, the older one becomes `categories_old`.
+
+        With a CategorySnapshotStore passed, jobs already in the store are not downloaded again and every newly
+        downloaded job is saved there.
+        """
+        if store is not None:
+            return self.load_from_store(client, project, store)
 
-        counter = 0
-        job_results = [[], []]
+        jobs = self.get_last_jobs(project)
 
-        for job in jobs_summary:
-            job_results[counter] = []
+        self.categories_old = self.fetch_categories(client, jobs[-2]['key']) if len(jobs) > 1 else []
+        self.categories_new = self.fetch_categories(client, jobs[-1]['key']) if len(jobs) > 0 else []
+        return self
 
-            for item in client.get_job(job['key']).items.iter():
-                job_results[counter].append({
-                    'category_name': item['wb_category_name'],
-                    'category_url': item['wb_category_url'],
-                })
+    def load_from_store(self, client, project, store):
+        """Compare the newest finished job with the previous one, downloading only jobs missing in the store."""
+        jobs = self.get_last_jobs(project)
 
-            counter += 1
+        for job in jobs:
+            if job['key'] not in store:
+                store.put(job['key'], self.fetch_categories(client, job['key']), finished_time=job.get('finished_time'))
 
-        self.categories_old = job_results[0]
-        self.categories_new = job_results[1]
+        keys = [job['key'] for job in jobs]
+
+        self.categories_old = store.get(keys[-2]) if len(keys) > 1 else []
+        self.categories_new = store.get(keys[-1]) if len(keys) > 0 else []
         return self
 
+    def get_last_jobs(self, project, count=2):
+        """Last finished category jobs from the oldest to the newest.
+
+        Scrapinghub lists jobs newest first, finish time (when present) settles the order anyway.
+        """
+        jobs = list(project.jobs.iter(has_tag=['daily_categories'], state='finished', count=count))
+        jobs.reverse()
+
+        return sorted(jobs, key=lambda job: job.get('finished_time', 0))
+
+    def load_from_snapshots(self, store, old_key, new_key=None):
+        """Compare any two stored snapshots, the newest one by default. Raises ValueError for missing snapshots."""
+        if new_key is None and len(store.keys()) > 0:
+            new_key = store.keys()[-1]
+
+        for name, key in [('old_key', old_key), ('new_key', new_key)]:
+            if key is None or key not in store:
+                raise ValueError(f'Snapshot {name}={key} not found in the store')
+
+        self.categories_old = store.get(old_key)
+        self.categories_new = store.get(new_key)
+        return self
+
+    def fetch_categories(self, client, job_key):
+        categories = []
+
+        for item in client.get_job(job_key).items.iter():
+            categories.append({
+                'category_name': item['wb_category_name'],
+                'category_url': item['wb_category_url'],
+            })
+
+        return categories
+
     def add_category_search_url(self):
         for _type in self._types:
-            self.diff[_type]['category_search_url'] = self.diff[_type]['category_name'].apply(
-                lambda x: self.generate_search_url(x),
-            )
+            self.diff[_type]['category_search_url'] = get_category_search_urls(self.diff[_type]['category_name'])
 
     def add_category_type(self):
         for _type in self._types:
-            self.diff[_type]['category_type'] = self.diff[_type]['category_url'].apply(
-                lambda x: self.generate_category_type(x),
+            self.diff[_type]['category_type'] = get_category_types(
+                self.diff[_type]['category_url'], rules=self.category_type_rules,
             )
 
     def sort_by(self, _field):
         for _type in self._types:
-            self.diff[_type].sort_values(by=[_field])
+            self.diff[_type] = self.diff[_type].sort_values(by=[_field], kind='mergesort')
 
     def calculate_diff(self):
-        self.calculate_added_diff()
-        self.calculate_removed_diff()
-        self.calculate_full_diff()
+        self.calculate_set_diff()
 
         self.add_category_search_url()
         self.add_category_type()
         self.sort_by('category_type')
 
-    def calculate_full_diff(self):
+    def calculate_set_diff(self):
         """
-        Retrieve all different values from two dictionaries.
+        Retrieve added, removed and all different values from two lists in one pass.
 
-        Details: https://pythondata.com/quick-tip-comparing-two-pandas-dataframes-and-getting-the-differences/
+        Every (category_name, category_url) pair is hashed once, all diffs are derived from the hashes.
         """
-        df1 = pd.DataFrame(self.categories_old, columns=self._columns)
-        df2 = pd.DataFrame(self.categories_new, columns=self._columns)
-
-        df = pd.concat([df1, df2])  # concat dataframes
-        df = df.reset_index(drop=True)  # reset the index
-        df_gpby = df.groupby(list(df.columns))  # group by
+        df_old = pd.DataFrame(self.categories_old, columns=self._columns)
+        df_new = pd.DataFrame(self.categories_new, columns=self._columns)
 
-        diff_indexes = [x[0] for x in df_gpby.groups.values() if len(x) == 1]  # reindex
+        hashes_old = pd.util.hash_pandas_object(df_old, index=False).to_numpy()
+        hashes_new = pd.util.hash_pandas_object(df_new, index=False).to_numpy()
 
-        ri = df.reindex(diff_indexes)
+        # в полный дифф попадают пары, которые встречаются ровно один раз в обоих списках вместе
+        _, inverse, counts = np.unique(np.concatenate([hashes_old, hashes_new]), return_inverse=True, return_counts=True)
+        once = counts[inverse] == 1
 
-        self.diff['full'] = ri.groupby('category_url', as_index=False).first()
-        self.diff_unique['full'] = self.diff['full'].groupby('category_name', as_index=False).first()
+        self.diff['added'] = df_new.take(np.flatnonzero(~np.isin(hashes_new, hashes_old)))
+        self.diff['removed'] = df_old.take(np.flatnonzero(~np.isin(hashes_old, hashes_new)))
 
-        return self
+        # как и раньше после группировки по всем колонкам, строки упорядочены по названию и адресу
+        df_once = pd.concat([df_old, df_new], ignore_index=True).take(np.flatnonzero(once))
+        self.diff['full'] = self.first_by(df_once.sort_values(by=self._columns, kind='mergesort'), 'category_url')
 
-    def calculate_added_diff(self):
-        """
-        Retrieve only new values from two dictionaries.
+        for _type in self._types:
+            self.diff_unique[_type] = self.first_by(self.diff[_type], 'category_name')
 
-        :return:
-        """
-        df_old = pd.DataFrame(self.categories_old, columns=self._columns)
-        df_new = pd.DataFrame(self.categories_new, columns=self._columns)
+        return self
 
-        df_diff = pd.merge(df_new, df_old, how='outer', indicator=True)
-        self.diff['added'] = df_diff.loc[df_diff._merge == 'left_only', self._columns]
-        self.diff_unique['added'] = self.diff['added'].groupby('category_name', as_index=False).first()
+    def calculate_full_diff(self):
+        """Retrieve all different values from two lists."""
+        return self.calculate_set_diff()
 
-        return self
+    def calculate_added_diff(self):
+        """Retrieve only new values from two lists."""
+        return self.calculate_set_diff()
 
     def calculate_removed_diff(self):
-        """
-        Retrieve only old values from two dictionaries.
+        """Retrieve only old values from two lists."""
+        return self.calculate_set_diff()
 
-        :return:
-        """
-        df_old = pd.DataFrame(self.categories_old, columns=self._columns)
-        df_new = pd.DataFrame(self.categories_new, columns=self._columns)
+    @staticmethod
+    def first_by(df, field):
+        """First row for every value of the field, sorted by the field (same as groupby(field).first())."""
+        df = df.dropna(subset=[field]).drop_duplicates(subset=[field]).sort_values(by=[field], kind='mergesort')
 
-        df_diff = pd.merge(df_old, df_new, how='outer', indicator=True)
-        self.diff['removed'] = df_diff.loc[df_diff._merge == 'left_only', self._columns]
-        self.diff_unique['removed'] = self.diff['removed'].groupby('category_name', as_index=False).first()
-
-        return self
+        return df.loc[:, [field] + [column for column in df.columns if column != field]].reset_index(drop=True)
 
     def get_categories_count(self, _type=None) -> int:
         if _type is None:
@@ -161,22 +202,62 @@ class CategoryListUpdates:
 
         return len(self.diff_unique[_type])
 
-    def dump_to_s3_file(self, _type=None):
+    def dump_to_s3_file(self, _type=None, client=None, bucket=None):
         if _type is None:
             raise Exception('type is not defined')
 
-        prefix = _type + '_'
-        temp_file = tempfile.NamedTemporaryFile(suffix='.xlsx', prefix=prefix, mode='r+b', delete=True)
-        temp_file_name = os.path.basename(temp_file.name)
+        self.s3_files[_type] = self.upload_to_s3(_type, file_format='xlsx', client=client, bucket=bucket)
 
-        self.diff[_type].to_excel(temp_file.name, index=None, header=True)
+        return self
 
-        s3.upload_file(temp_file.name, env('AWS_S3_BUCKET_NAME'), temp_file_name)
+    def dump_to_s3(self, file_format='csv', client=None, bucket=None, transfer_config=None):
+        """Upload all diff types concurrently, each one streamed from memory with multipart upload."""
+        with ThreadPoolExecutor(max_workers=len(self._types)) as executor:
+            futures = {
+                _type: executor.submit(self.upload_to_s3, _type, file_format, client, bucket, transfer_config)
+                for _type in self._types
+            }
 
-        self.s3_files[_type] = temp_file_name
+            for _type, future in futures.items():
+                self.s3_files[_type] = future.result()
 
         return self
 
+    def upload_to_s3(self, _type, file_format='csv', client=None, bucket=None, transfer_config=None):
+        client = client or get_s3_client()
+
+        if bucket is None:
+            from envparse import env
+
+            bucket = env('AWS_S3_BUCKET_NAME')
+
+        file_name = f'{_type}_{uuid.uuid4().hex[:8]}.{file_format}'
+        extra = {'Config': transfer_config} if transfer_config is not None else {}
+
+        client.upload_fileobj(self.export_to_buffer(_type, file_format), bucket, file_name, **extra)
+
+        return file_name
+
+    def export_to_buffer(self, _type=None, file_format='csv'):
+        if _type is None:
+            raise Exception('type is not defined')
+
+        if file_format not in self.export_formats:
+            raise ValueError(f'Unknown export format {file_format}, choose one of {self.export_formats}')
+
+        buffer = io.BytesIO()
+
+        if file_format == 'csv':
+            self.diff[_type].to_csv(buffer, index=False, header=True)
+        elif file_format == 'parquet':
+            self.diff[_type].to_parquet(buffer, index=False)
+        else:
+            self.diff[_type].to_excel(buffer, index=None, header=True)
+
+        buffer.seek(0)
+
+        return buffer
+
     def get_s3_file_name(self, _type=None):
         if _type is None:
             raise Exception('type is not defined')
@@ -0,0 +1,66 @@
+import argparse
+import logging
+import sys
+import time
+
+from .batch import iter_batch, results_to_frame
+from .utils.transformers import (EmptyTransformer, MpstatsWildbserriesTransformer, WildsearchCrawlerOzonTransformer,
+                                 WildsearchCrawlerWildberriesTransformer)
+
+logger = logging.getLogger('seller_stats')
+
+TRANSFORMERS = {
+    'none': EmptyTransformer,
+    'wb': WildsearchCrawlerWildberriesTransformer,
+    'ozon': WildsearchCrawlerOzonTransformer,
+    'mpstats': MpstatsWildbserriesTransformer,
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='seller-stats',
+        description='Calculate category stats for CSV files and Scrapinghub jobs and save them to one Parquet file.',
+    )
+    parser.add_argument('sources', nargs='+', help='CSV file paths or Scrapinghub job ids like 123/4/5')
+    parser.add_argument('--transformer', choices=TRANSFORMERS.keys(), default='none', help='items layout')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, all cores by default')
+    parser.add_argument('--hhi-by', nargs='+', default=['brand_name'], help='fields to calculate HHI for')
+    parser.add_argument('--output', default='seller_stats.parquet', help='Parquet file for results')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    logging.basicConfig(level=args.log_level, format='%(asctime)s %(levelname)s %(message)s')
+
+    transformer = TRANSFORMERS[args.transformer]()
+    started = time.perf_counter()
+    results = {}
+    done = rows = 0
+
+    for result in iter_batch(args.sources, transformer=transformer, workers=args.workers, hhi_by=args.hhi_by):
+        results[result.source] = result
+        done += 1
+        rows += result.count_raw or 0
+        elapsed = time.perf_counter() - started
+
+        status = f'failed with {result.error}' if result.error else f'{result.count_clean} rows'
+
+        logger.info(f'[{done}/{len(args.sources)}] {result.source}: {status}, '
+                    f'{done / elapsed:.2f} sources/s, {rows / elapsed:.0f} rows/s')
+
+    df = results_to_frame([results[source] for source in args.sources if source in results])
+    df.to_parquet(args.output, index=False)
+
+    failed = df.error.notna().sum()
+    logger.info(f'Saved {len(df.index)} results to {args.output} in {time.perf_counter() - started:.1f}s, {failed} failed')
+
+    return 1 if failed > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
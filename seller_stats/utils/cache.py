@@ -0,0 +1,94 @@
+import logging
+import os
+from urllib.parse import quote
+
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+
+class ItemCache:
+    """On-disk cache of transformed items of finished Scrapinghub jobs, stored as Arrow IPC files.
+
+    Entries are read back memory-mapped. When the cache grows over `max_bytes` least recently used entries are
+    evicted (every hit bumps file modification time).
+    """
+
+    suffix = '.arrow'
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 ** 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.path, exist_ok=True)
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.path, quote(key, safe='') + self.suffix)
+
+    def get(self, key: str):
+        """Memory-mapped Arrow table of the entry, its data is read from disk only when used."""
+        path = self.get_path(key)
+
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+
+        os.utime(path)
+        self.hits += 1
+
+        return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+    def put(self, key: str, df):
+        path = self.get_path(key)
+
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as error:
+            logger.warning(f'Items for {key} can not be cached: {error}')
+            return self
+
+        # пишем во временный файл, чтобы параллельный читатель никогда не увидел недописанный кэш
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with pa.OSFile(temp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+        os.replace(temp_path, path)
+
+        return self.evict()
+
+    def entries(self) -> list:
+        """Cache files from the least to the most recently used."""
+        paths = [os.path.join(self.path, name) for name in os.listdir(self.path) if name.endswith(self.suffix)]
+
+        return sorted(paths, key=os.path.getmtime)
+
+    def size(self) -> int:
+        return sum(os.path.getsize(path) for path in self.entries())
+
+    def evict(self):
+        entries = self.entries()
+        size = sum(os.path.getsize(path) for path in entries)
+
+        for path in entries:
+            if size <= self.max_bytes:
+                break
+
+            size -= os.path.getsize(path)
+            os.remove(path)
+
+            logger.info(f'Evicted {path} from items cache')
+
+        return self
+
+    def stats(self) -> dict:
+        entries = self.entries()
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(entries),
+            'bytes': sum(os.path.getsize(path) for path in entries),
+        }
@@ -0,0 +1,38 @@
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+SEARCH_URL_PREFIX = 'https://www.wildberries.ru/catalog/0/search.aspx?search='
+
+CATEGORY_TYPE_RULES = [
+    ('/catalog/novinki/', 'Новинки'),
+    ('/promotions/', 'Промо'),
+]
+
+CATEGORY_TYPE_DEFAULT = 'Обычная'
+
+
+def get_category_search_urls(names: pd.Series) -> pd.Series:
+    """Build WB search URLs for category names, percent-encoding every distinct name once."""
+    codes, uniques = pd.factorize(names)
+
+    # последний элемент достается отсутствующим названиям (код -1)
+    urls = np.array([SEARCH_URL_PREFIX + quote(str(name), safe='') for name in uniques] + [np.nan], dtype=object)
+
+    return pd.Series(urls[codes], index=names.index, name='category_search_url')
+
+
+def get_category_types(urls: pd.Series, rules=None, default=CATEGORY_TYPE_DEFAULT) -> pd.Series:
+    """Classify category URLs by (substring, type) rules, the first matching rule wins."""
+    rules = rules if rules is not None else CATEGORY_TYPE_RULES
+    codes, uniques = pd.factorize(urls)
+    uniques = pd.Series(uniques, dtype=object)
+
+    # последний элемент достается отсутствующим адресам (код -1), правила применяются с конца, чтобы победило первое
+    types = np.full(len(uniques) + 1, default, dtype=object)
+
+    for substring, _type in reversed(rules):
+        types[:-1][uniques.str.contains(substring, regex=False, na=False).to_numpy()] = _type
+
+    return pd.Series(types[codes], index=urls.index, name='category_type')
@@ -1,3 +1,7 @@
+import numpy as np
+import pandas as pd
+
+
 def format_number(number):
     number = int(number) if float(round(number, 2)) % 1 == 0 else round(float(number), 2)
 
@@ -18,3 +22,100 @@ def format_currency(number, currency='руб.'):
 
 def format_quantity(number, quanter='шт.'):
     return format_add_postfix(number, quanter, highlighter='`')
+
+
+# дальше этого значения шаг float становится сравним с копейками, такие числа форматируем по одному
+BULK_MAX_ABS_VALUE = 1e12
+
+
+def format_numbers(numbers):
+    """Format a whole array or Series the same way as format_number does with every single value (as Python float)."""
+    values = np.asarray(numbers)
+    flat = values.ravel()
+
+    if values.dtype.kind in 'iu':
+        formatted = _format_integers(flat.astype(np.int64 if values.dtype.kind == 'i' else np.uint64))
+    elif values.dtype.kind == 'f':
+        formatted = _format_floats(flat.astype(np.float64))
+    else:
+        formatted = np.array([format_number(number) for number in flat], dtype=object)
+
+    return _like(numbers, formatted.reshape(values.shape))
+
+
+def format_add_postfixes(numbers, postfix, highlighter=''):
+    # отформатированное число не бывает пустым и не начинается/кончается пробелом, так что strip() касается только краев
+    formatted = highlighter.lstrip() + format_numbers(np.asarray(numbers)) + f'{highlighter} {postfix}'.rstrip()
+
+    return _like(numbers, formatted)
+
+
+def format_percents(ratios):
+    return _like(ratios, format_numbers(np.asarray(ratios) * 100) + '%')
+
+
+def format_currencies(numbers, currency='руб.'):
+    return format_add_postfixes(numbers, currency, highlighter='`')
+
+
+def format_quantities(numbers, quanter='шт.'):
+    return format_add_postfixes(numbers, quanter, highlighter='`')
+
+
+def _like(numbers, formatted):
+    if isinstance(numbers, pd.Series):
+        return pd.Series(formatted, index=numbers.index, name=numbers.name, dtype=object)
+
+    return formatted
+
+
+# готовые строки для групп разрядов и копеек, чтобы собирать числа сложением массивов, а не форматированием
+_GROUP_HEADS = np.array([str(group) for group in range(1000)], dtype=object)
+_GROUP_TAILS = np.array([f' {group:03d}' for group in range(1000)], dtype=object)
+_CENTS = np.array([''] + [',' + f'{cents:02d}'.rstrip('0') for cents in range(1, 100)], dtype=object)
+
+
+def _format_integers(values, cents=None, negative=None):
+    """Integer part with space thousands separator, optionally followed by comma and significant cents."""
+    negative = values < 0 if negative is None else negative
+    rest = np.abs(values).astype(np.uint64)
+
+    formatted = np.where(rest >= 1000, _GROUP_TAILS[rest % 1000], _GROUP_HEADS[rest % 1000])
+    rest = rest // 1000
+
+    while rest.any():
+        groups = np.where(rest >= 1000, _GROUP_TAILS[rest % 1000], _GROUP_HEADS[rest % 1000])
+        formatted = np.where(rest > 0, groups + formatted, formatted)
+        rest = rest // 1000
+
+    formatted = np.where(negative, '-', '').astype(object) + formatted
+
+    if cents is not None:
+        formatted = formatted + _CENTS[cents]
+
+    return formatted
+
+
+def _format_floats(values):
+    scaled = values * 100
+    cents_total = np.rint(scaled)
+
+    # значения, для которых округление numpy может разойтись с round(), и все нечисловые форматируем по одному
+    with np.errstate(invalid='ignore'):
+        distance = np.abs(np.abs(scaled - np.floor(scaled)) - .5)
+        slow = ~np.isfinite(values) | (np.abs(values) >= BULK_MAX_ABS_VALUE) | (distance < 1e-6 + np.abs(scaled) * 1e-15)
+
+    cents_total = np.where(slow, 0, cents_total).astype(np.int64)
+    is_integer = cents_total % 100 == 0
+
+    # round(number, 2) дает целое — тогда format_number берет int(number), то есть отбрасывает дробную часть
+    units = np.where(is_integer, np.trunc(np.where(slow, 0, values)), np.abs(cents_total) // 100).astype(np.int64)
+    cents = np.where(is_integer, 0, np.abs(cents_total) % 100)
+    negative = np.where(is_integer, units < 0, cents_total < 0)
+
+    formatted = _format_integers(units, cents, negative)
+
+    for position in np.flatnonzero(slow):
+        formatted[position] = format_number(float(values[position]))
+
+    return formatted
@@ -0,0 +1,133 @@
+import logging
+import os
+from datetime import date as date_type
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote, unquote
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class SalesHistoryStore:
+    """Successive CategoryStats snapshots as Parquet files partitioned by category and scrape date.
+
+    Files are laid out as category=<quoted name>/date=YYYY-MM-DD/part.parquet with rows sorted by id, so every query
+    reads only the partitions of its category and date range.
+    """
+
+    fields = ['id', 'purchases', 'turnover', 'price']
+    file_name = 'part.parquet'
+
+    def __init__(self, path: str):
+        self.path = path
+
+        os.makedirs(self.path, exist_ok=True)
+
+    def put(self, stats, category: str = None, date=None):
+        """Save a CategoryStats (or a frame with the same fields) as the snapshot of its category on the date."""
+        df = stats.df if hasattr(stats, 'df') else stats
+
+        if category is None and 'category_name' not in df.columns:
+            raise ValueError('Category is not defined, pass it explicitly')
+
+        category = category or df['category_name'].iloc[0]
+        date = self._to_date(date if date is not None else getattr(stats, 'now', None))
+
+        if 'turnover' not in df.columns:
+            df = df.assign(turnover=df['price'] * df['purchases'])
+
+        snapshot = df.reindex(columns=self.fields).dropna(subset=['id']).sort_values('id', kind='mergesort')
+
+        partition = self._partition_path(category, date)
+        os.makedirs(partition, exist_ok=True)
+        snapshot.to_parquet(os.path.join(partition, self.file_name), index=False)
+
+        logger.info(f'Saved {len(snapshot.index)} rows of {category} for {date} to history')
+
+        return self
+
+    def categories(self) -> list:
+        return sorted(unquote(name[len('category='):]) for name in os.listdir(self.path) if name.startswith('category='))
+
+    def dates(self, category: str) -> list:
+        category_path = self._category_path(category)
+
+        if not os.path.isdir(category_path):
+            return []
+
+        return sorted(
+            date_type.fromisoformat(name[len('date='):]) for name in os.listdir(category_path) if name.startswith('date=')
+        )
+
+    def load(self, category: str, start=None, end=None) -> pd.DataFrame:
+        """Snapshots of the category between start and end dates (inclusive) with a `date` column added."""
+        dates = [
+            date for date in self.dates(category)
+            if (start is None or date >= self._to_date(start)) and (end is None or date <= self._to_date(end))
+        ]
+
+        frames = [
+            pd.read_parquet(os.path.join(self._partition_path(category, date), self.file_name)).assign(date=pd.Timestamp(date))
+            for date in dates
+        ]
+
+        if len(frames) == 0:
+            return pd.DataFrame(columns=self.fields + ['date'])
+
+        return pd.concat(frames, ignore_index=True)
+
+    def sales(self, category: str, days: int = 30, end=None) -> pd.DataFrame:
+        """Purchases and turnover of every SKU over the last `days` days before the latest snapshot not after `end`.
+
+        Every SKU of the latest snapshot is compared with its newest snapshot made `days` days earlier or before,
+        SKUs that appeared later are compared with their first snapshot. `days` holds the real span of each pair.
+        """
+        dates = [date for date in self.dates(category) if end is None or date <= self._to_date(end)]
+
+        if len(dates) == 0:
+            return pd.DataFrame(columns=['id', 'purchases', 'turnover', 'date_from', 'date_to', 'days'])
+
+        date_to = dates[-1]
+        date_from = date_to - timedelta(days=days)
+
+        # достаточно последнего снимка до начала периода и всех снимков после него
+        baseline = [date for date in dates if date <= date_from]
+        history = self.load(category, start=baseline[-1] if len(baseline) > 0 else None, end=date_to)
+
+        current = history[history['date'] == pd.Timestamp(date_to)].assign(as_of=pd.Timestamp(date_from))
+        previous = history.loc[:, ['id', 'date', 'purchases', 'turnover']].sort_values('date', kind='mergesort')
+
+        matched = pd.merge_asof(
+            current.sort_values('as_of', kind='mergesort'), previous, left_on='as_of', right_on='date', by='id',
+            direction='backward', suffixes=('', '_from'),
+        )
+        first_seen = pd.merge_asof(
+            current.sort_values('as_of', kind='mergesort'), previous, left_on='as_of', right_on='date', by='id',
+            direction='forward', suffixes=('', '_from'),
+        )
+
+        for field in ['date_from', 'purchases_from', 'turnover_from']:
+            matched[field] = matched[field].fillna(first_seen[field])
+
+        return pd.DataFrame({
+            'id': matched['id'],
+            'purchases': matched['purchases'] - matched['purchases_from'],
+            'turnover': matched['turnover'] - matched['turnover_from'],
+            'date_from': matched['date_from'],
+            'date_to': matched['date'],
+            'days': (matched['date'] - matched['date_from']).dt.days,
+        }).sort_values('id', kind='mergesort').reset_index(drop=True)
+
+    def _category_path(self, category: str) -> str:
+        return os.path.join(self.path, f'category={quote(str(category), safe="")}')
+
+    def _partition_path(self, category: str, date) -> str:
+        return os.path.join(self._category_path(category), f'date={date.isoformat()}')
+
+    @staticmethod
+    def _to_date(value) -> date_type:
+        if value is None:
+            return datetime.now(tz=timezone.utc).date()
+
+        return pd.Timestamp(value).date()
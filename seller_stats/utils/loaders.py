@@ -1,19 +1,45 @@
+import asyncio
 import logging
 from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from csv import DictReader
+from itertools import islice
+from typing import TYPE_CHECKING, NamedTuple, Type
 
-from envparse import ConfigurationError, env
-from scrapinghub import ScrapinghubClient
+import pandas as pd
 
+from ..base import DataSet
 from ..exceptions import NotReady
+from .instrumentation import Instrumentation, instrumented
 from .transformers import EmptyTransformer, Transformer
 
+if TYPE_CHECKING:
+    from scrapinghub import ScrapinghubClient
+
 logger = logging.getLogger(__name__)
 
 
+def get_scrapinghub_client(client: 'ScrapinghubClient' = None) -> 'ScrapinghubClient':
+    """Return the passed client or a new one for SH_APIKEY. Scrapinghub is only imported when a client is created."""
+    if client is not None:
+        return client
+
+    from envparse import ConfigurationError, env
+    from scrapinghub import ScrapinghubClient
+
+    try:
+        return ScrapinghubClient(env('SH_APIKEY'))
+    except ConfigurationError:
+        error_message = 'Scrapinghub init failed. Pass scrapinghub client or set SH_APIKEY env.'
+
+        logger.error(error_message)
+        raise ConfigurationError(error_message)
+
+
 class Loader:
-    def __init__(self, transformer: Transformer = None):
+    def __init__(self, transformer: Transformer = None, instrumentation: Instrumentation = None):
         self.transformer = transformer or EmptyTransformer()
+        self.instrumentation = instrumentation
 
     @abstractmethod
     def load(self):
@@ -21,48 +47,175 @@ class Loader:
 
 
 class ScrapinghubLoader(Loader):
-    def __init__(self, job_id: str, client: ScrapinghubClient = None, transformer: Transformer = None):
+    def __init__(self, job_id: str, client: 'ScrapinghubClient' = None, transformer: Transformer = None, cache=None,
+                 instrumentation: Instrumentation = None):
         self.job_id = job_id
+        self.cache = cache
 
-        try:
-            self.client = client or ScrapinghubClient(env('SH_APIKEY'))
-        except ConfigurationError:
-            error_message = 'Scrapinghub init failed. Pass scrapinghub client or set SH_APIKEY env.'
-
-            logger.error(error_message)
-            raise ConfigurationError(error_message)
+        self.client = get_scrapinghub_client(client)
 
         logger.info(f'Loading items from scrapinghub job {job_id}')
 
-        super().__init__(transformer=transformer)
+        super().__init__(transformer=transformer, instrumentation=instrumentation)
 
-    def load(self):
-        if self.client.get_job(self.job_id).metadata.get('state') != 'finished':
+    def get_finished_job(self):
+        job = self.client.get_job(self.job_id)
+
+        if job.metadata.get('state') != 'finished':
             error_message = f'Job {self.job_id} is not finished yet'
 
             logger.error(error_message)
 
             raise NotReady(error_message)
 
-        items = [self.transformer.transform_item(item) for item in self.client.get_job(self.job_id).items.iter()]
+        return job
+
+    @instrumented('scrapinghub_load')
+    def load(self):
+        items = [self.transformer.transform_item(item) for item in self.get_finished_job().items.iter()]
 
         logger.info(f'Loaded {len(items)} items from scrapinghub')
 
         return items
 
+    def iter_chunks(self, size: int = 10000):
+        """Stream job items as transformed DataFrame chunks of at most `size` rows.
+
+        Items are pulled from a single items stream, so only one chunk is held in memory at a time.
+        """
+        if size < 1:
+            raise ValueError('Chunk size should be a positive integer')
+
+        items = self.get_finished_job().items.iter()
+        count = 0
+
+        while True:
+            chunk = list(islice(items, size))
+
+            if len(chunk) == 0:
+                break
+
+            count += len(chunk)
+
+            yield self.transformer.transform_frame(pd.DataFrame(data=chunk))
+
+        logger.info(f'Streamed {count} items from scrapinghub')
+
+    @instrumented('scrapinghub_load_frame')
+    def load_frame(self, chunk_size: int = 10000):
+        """Load all transformed items as a single DataFrame, through the items cache if one is set.
+
+        Finished jobs never change, so a cached job is served without touching the network.
+        """
+        cache_key = f'{self.job_id}:{type(self.transformer).__name__}:{self.transformer.rules_digest()}'
+
+        if self.cache is not None:
+            table = self.cache.get(cache_key)
+
+            if table is not None:
+                logger.info(f'Loaded {table.num_rows} items from cache')
+
+                # колонки без пропусков ссылаются прямо на отображенный в память файл, остальные копируются
+                return table.to_pandas(split_blocks=True)
+
+        chunks = list(self.iter_chunks(size=chunk_size))
+        df = pd.concat(chunks, ignore_index=True) if len(chunks) > 0 else pd.DataFrame()
+
+        if self.cache is not None:
+            self.cache.put(cache_key, df)
+
+        return df
+
+
+class JobResult(NamedTuple):
+    job_id: str
+    df: pd.DataFrame = None
+    error: Exception = None
+
+
+class AsyncScrapinghubLoader(Loader):
+    """Load many Scrapinghub jobs concurrently, with at most `concurrency` jobs in flight.
+
+    Blocking client calls run on a thread pool driven by asyncio and share the client's pooled HTTP session.
+    A client created by the loader gets a connection pool sized to `concurrency`, a passed client is used as is.
+    Every job gets its own JobResult with either a transformed DataFrame or an error, so one failed job doesn't
+    break the others.
+    """
+
+    def __init__(self, job_ids: list, client: 'ScrapinghubClient' = None, transformer: Transformer = None,
+                 concurrency: int = 10, chunk_size: int = 10000, cache=None):
+        self.job_ids = list(job_ids)
+        self.cache = cache
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+
+        self.client = get_scrapinghub_client(client)
+
+        # пул соединений должен вмещать все одновременные запросы, иначе они будут ждать друг друга
+        session = getattr(getattr(self.client, '_hsclient', None), 'session', None)
+        if client is None and session is not None:
+            from requests.adapters import HTTPAdapter
+
+            session.mount('https://', HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency))
+
+        super().__init__(transformer=transformer)
+
+    async def load(self):
+        loop = asyncio.get_running_loop()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = await asyncio.gather(*[loop.run_in_executor(executor, self.load_job, job_id) for job_id in self.job_ids])
+
+        failed = [result for result in results if result.error is not None]
+        logger.info(f'Loaded {len(results) - len(failed)} jobs from scrapinghub, {len(failed)} failed')
+
+        return results
+
+    def load_job(self, job_id: str) -> JobResult:
+        loader = ScrapinghubLoader(job_id=job_id, client=self.client, transformer=self.transformer, cache=self.cache)
+
+        try:
+            return JobResult(job_id=job_id, df=loader.load_frame(chunk_size=self.chunk_size))
+        except Exception as error:  # noqa: B902
+            return JobResult(job_id=job_id, error=error)
+
 
 class CsvLoader(Loader):
-    def __init__(self, file_path: str, reader: DictReader = None, transformer: Transformer = None):
+    def __init__(self, file_path: str, reader: DictReader = None, transformer: Transformer = None,
+                 instrumentation: Instrumentation = None):
         self.file_path = file_path
         self.reader = reader or DictReader(open(self.file_path, 'r'))
 
         logger.info(f'Loading items from CSV file {file_path}')
 
-        super().__init__(transformer=transformer)
+        super().__init__(transformer=transformer, instrumentation=instrumentation)
 
+    @instrumented('csv_load')
     def load(self):
         items = [self.transformer.transform_item(item) for item in self.reader]
 
         logger.info(f'Loaded {len(items)} items from CSV')
 
         return items
+
+    @instrumented('csv_load_frame')
+    def load_frame(self, dataset: Type[DataSet] = None, usecols: list = None):
+        """Read the whole file with a vectorized parser straight into a transformed DataFrame.
+
+        With `dataset` passed only the columns it needs are read and its `fields_force_types` are applied while parsing.
+        """
+        rules = {} if isinstance(self.transformer, EmptyTransformer) else self.transformer.transform_rules
+        sources = {target: source for source, target in rules.items()}
+
+        if usecols is None and dataset is not None:
+            usecols = list(dataset.fields_required) + list(dataset.fields_optional)
+
+        wanted = None if usecols is None else {sources.get(field, field) for field in usecols}
+        dtype = None if dataset is None else {sources.get(field, field): _type for field, _type in dataset.fields_force_types.items()}
+
+        df = pd.read_csv(self.file_path, usecols=None if wanted is None else wanted.__contains__, dtype=dtype)
+        df = self.transformer.transform_frame(df)
+
+        logger.info(f'Loaded {len(df.index)} items from CSV')
+
+        return df
@@ -0,0 +1,108 @@
+import inspect
+import weakref
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+
+class FrameFingerprint:
+    """Identity of a frame: its shape, columns, version and the arrays holding every column.
+
+    Assigning a column (df['x'] = ...) or replacing the frame gives new arrays, so such changes are detected
+    without hashing the data. Only values changed in place (df.loc[...] = ...) need DataSet.invalidate().
+    """
+
+    def __init__(self, df: pd.DataFrame, version: int = 0):
+        self.key = (df.shape, tuple(df.columns), version)
+        # слабые ссылки не держат старые колонки в памяти, а мертвая ссылка означает, что колонку заменили
+        self.arrays = [weakref.ref(array) for array in column_arrays(df)]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, FrameFingerprint) or self.key != other.key:
+            return False
+
+        return all(mine() is not None and mine() is theirs() for mine, theirs in zip(self.arrays, other.arrays))
+
+
+def column_arrays(df: pd.DataFrame) -> list:
+    """Arrays owning the data of every column: extension arrays as they are, numpy views traced to their base."""
+    arrays = []
+
+    for _, series in df.items():
+        values = series.array if pd.api.types.is_extension_array_dtype(series.dtype) else series.to_numpy()
+
+        while isinstance(values, np.ndarray) and isinstance(values.base, np.ndarray):
+            values = values.base
+
+        arrays.append(values)
+
+    return arrays
+
+
+class ResultCache:
+    """Derived results of one DataSet, dropped as soon as the fingerprint of its frame changes."""
+
+    def __init__(self):
+        self.results = {}
+        self.fingerprint = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, fingerprint, key, compute):
+        if fingerprint != self.fingerprint:
+            self.results = {}
+            self.fingerprint = fingerprint
+
+        if key in self.results:
+            self.hits += 1
+
+            return self.results[key]
+
+        self.misses += 1
+        self.results[key] = compute()
+
+        return self.results[key]
+
+    def info(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.results)}
+
+
+def memoized(func):
+    """Cache results of a method or a function of a DataSet in `dataset.results`, keyed by function and arguments.
+
+    Cached results are shared between calls, so they should not be modified. Results are dropped when the frame or
+    any of its columns is replaced (see FrameFingerprint). Calls with unhashable arguments and objects without
+    a result cache are computed as usual.
+    """
+    signature = inspect.signature(func)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        # аргументы приводим к одному виду, чтобы позиционные, именованные и значения по умолчанию давали один ключ
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+
+        (_, dataset), *arguments = bound.arguments.items()
+        cache = getattr(dataset, 'results', None)
+
+        if not isinstance(cache, ResultCache):
+            return func(*args, **kwargs)
+
+        key = (func.__module__, func.__qualname__, _freeze(arguments))
+
+        try:
+            hash(key)
+        except TypeError:
+            return func(*args, **kwargs)
+
+        return cache.get(dataset.fingerprint(), key, lambda: func(*args, **kwargs))
+
+    return wrapper
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+
+    return value
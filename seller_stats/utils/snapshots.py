@@ -0,0 +1,78 @@
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class CategorySnapshotStore:
+    """Local store of daily category lists, one Parquet file (dictionary-encoded strings) per Scrapinghub job.
+
+    An index file keeps the date and size of every snapshot, so the previous list never has to be downloaded again
+    and lists of any earlier date are at hand for diffs.
+    """
+
+    columns = ['category_name', 'category_url']
+    index_name = 'index.json'
+
+    def __init__(self, path: str):
+        self.path = path
+
+        os.makedirs(self.path, exist_ok=True)
+
+        index_path = os.path.join(self.path, self.index_name)
+        self.index = json.load(open(index_path)) if os.path.exists(index_path) else {}
+
+    def __contains__(self, job_key: str) -> bool:
+        return job_key in self.index
+
+    def put(self, job_key: str, categories, finished_time: int = None):
+        """Save categories (list of dicts or DataFrame) of a job finished at `finished_time` (ms since epoch)."""
+        df = pd.DataFrame(categories, columns=self.columns)
+        file_name = quote(job_key, safe='') + '.parquet'
+
+        df.to_parquet(os.path.join(self.path, file_name), index=False)
+
+        finished_time = finished_time or int(datetime.now(tz=timezone.utc).timestamp() * 1000)
+        self.index[job_key] = {
+            'file': file_name,
+            'finished_time': finished_time,
+            'date': datetime.fromtimestamp(finished_time / 1000, tz=timezone.utc).strftime('%Y-%m-%d'),
+            'count': len(df.index),
+        }
+
+        self._save_index()
+
+        logger.info(f'Saved {len(df.index)} categories of job {job_key} to snapshot store')
+
+        return self
+
+    def get(self, job_key: str) -> pd.DataFrame:
+        if job_key not in self.index:
+            return None
+
+        return pd.read_parquet(os.path.join(self.path, self.index[job_key]['file']))
+
+    def keys(self) -> list:
+        """Job keys from the oldest to the newest snapshot."""
+        return sorted(self.index.keys(), key=lambda key: self.index[key]['finished_time'])
+
+    def key_for_date(self, date) -> str:
+        """Key of the newest snapshot made on or before the date (datetime.date or YYYY-MM-DD)."""
+        date = date if isinstance(date, str) else date.strftime('%Y-%m-%d')
+        keys = [key for key in self.keys() if self.index[key]['date'] <= date]
+
+        return keys[-1] if len(keys) > 0 else None
+
+    def _save_index(self):
+        index_path = os.path.join(self.path, self.index_name)
+        temp_path = f'{index_path}.tmp'
+
+        with open(temp_path, 'w') as index_file:
+            json.dump(self.index, index_file)
+
+        os.replace(temp_path, index_path)
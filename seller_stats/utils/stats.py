@@ -1,20 +1,34 @@
 import numpy as np
 
+DEFAULT_VARIANTS = [10, 50, 100, 250, 500, 1000, 5000, 10000, 50000, 100000]
+
 
 def get_distribution_thresholds(series, batches=6, variants=None):
-    variants = variants or [10, 50, 100, 250, 500, 1000, 5000, 10000, 50000, 100000]
+    """Choose price intervals for a series, or for a QuantileSketch fed with it when the series is streamed."""
+    variants = variants or DEFAULT_VARIANTS
     max_series_value_percentile = series.quantile(.95)
 
+    batch_size = get_distribution_batch_sizes([max_series_value_percentile], batches=batches, variants=variants)[0]
+
+    return get_distribution_thresholds_for_batch_size(batch_size, batches=batches)
+
+
+def get_distribution_batch_sizes(percentiles, batches=6, variants=None):
+    """Choose batch size for every 95th percentile value at once."""
+    variants = np.array(variants or DEFAULT_VARIANTS)
+
     # отклонение максимального значения выборки от конца шкалы для каждой из шкал (выбросы исключены)
-    error = np.array(variants).astype(np.float32) * (batches - 1) - max_series_value_percentile
+    error = variants.astype(np.float32)[np.newaxis, :] * (batches - 1) - np.asarray(percentiles, dtype=np.float32)[:, np.newaxis]
 
     # конец шкалы должен быть больше максимального значения, так что все обратные случаи обращаем в минус бесконечность
     error[error > 0] = -np.inf
 
     # нам нужна размерность с минимальным отклонением
-    min_error_index = error.argmax()
+    return variants[error.argmax(axis=1)]
+
 
-    batch_size = variants[min_error_index]
+def get_distribution_thresholds_for_batch_size(batch_size, batches=6):
+    batch_size = int(batch_size)
 
     thresholds = list(range(0, batch_size * batches, batch_size))
 
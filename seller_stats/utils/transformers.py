@@ -1,3 +1,11 @@
+import hashlib
+import json
+
+
+def is_arrow_table(df):
+    return hasattr(df, 'rename_columns') and hasattr(df, 'column_names')
+
+
 class Transformer:
     transform_rules = {}
     drop_keys = []
@@ -27,12 +35,50 @@ class Transformer:
 
         return item
 
+    def rules_digest(self) -> str:
+        """Short digest of rename rules and dropped keys, transformers with different rules never share it."""
+        rules = json.dumps([self.transform_rules, list(self.drop_keys)], sort_keys=True, ensure_ascii=False)
+
+        return hashlib.sha1(rules.encode('utf-8')).hexdigest()[:12]
+
+    def transform_frame(self, df):
+        """Apply the same renames and drops as transform_item to a whole DataFrame or pyarrow Table at once."""
+        df = self.transform_frame_columns(df, self.transform_rules)
+        df = self.drop_frame_columns(df, self.drop_keys)
+
+        return df
+
+    @staticmethod
+    def transform_frame_columns(df, rules):
+        columns = list(df.column_names if is_arrow_table(df) else df.columns)
+        renames = {key: rules[key] for key in rules.keys() if key in columns and key != rules[key]}
+
+        # как и в transform_item_keys, переименованная колонка затирает уже существующую с тем же именем
+        overwritten = [column for column in columns if column in renames.values() and column not in renames]
+        df = Transformer.drop_frame_columns(df, overwritten)
+
+        if is_arrow_table(df):
+            return df.rename_columns([renames.get(column, column) for column in df.column_names])
+
+        return df.rename(columns=renames)
+
+    @staticmethod
+    def drop_frame_columns(df, drop_keys):
+        if is_arrow_table(df):
+            return df.drop([key for key in drop_keys if key in df.column_names])
+
+        return df.drop(columns=[key for key in drop_keys if key in df.columns])
+
 
 class EmptyTransformer(Transformer):
     @staticmethod
     def transform_item_keys(item, rules):
         return item
 
+    @staticmethod
+    def transform_frame_columns(df, rules):
+        return df
+
 
 class WildsearchCrawlerWildberriesTransformer(Transformer):
     transform_rules = {
@@ -13,6 +13,11 @@ setuptools.setup(
     long_description_content_type='text/markdown',
     url='https://github.com/wondersell/seller-stats',
     packages=setuptools.find_packages(),
+    entry_points={
+        'console_scripts': [
+            'seller-stats=seller_stats.cli:main',
+        ],
+    },
     classifiers=[
         'Development Status :: 4 - Beta',
         'Intended Audience :: Developers',
@@ -10,6 +10,11 @@ def current_path():
     return os.path.dirname(os.path.abspath(__file__))
 
 
+@pytest.fixture()
+def sample_csv_file_path(current_path):
+    return current_path + '/mocks/scrapinghub_items_wb_raw.csv'
+
+
 @pytest.fixture(autouse=True)
 def requests_mocker():
     """Mock all requests.
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from seller_stats.base import CleaningPlan, DataSet
+
+
+class SampleDataSet(DataSet):
+    fields_required = ('id', 'price', 'name', 'reviews')
+    fields_drop_empty_strings = ('name',)
+    fields_force_from_empty_string_to_nan = ('price', 'reviews')
+    fields_force_zeros_to_nan = ('reviews',)
+    fields_drop_na = ('price',)
+    fields_force_types = {
+        'price': 'float',
+        'reviews': 'float',
+    }
+
+
+@pytest.fixture()
+def sample_data():
+    return [
+        {'id': 1, 'price': '100', 'name': 'one', 'reviews': 10},
+        {'id': 2, 'price': '', 'name': 'two', 'reviews': 0},
+        {'id': 3, 'price': '300', 'name': '', 'reviews': ''},
+        {'id': 4, 'price': None, 'name': 'four', 'reviews': 5},
+        {'id': 5, 'price': '', 'name': '', 'reviews': 5},
+        {'id': 6, 'price': '600', 'name': 'six', 'reviews': 0},
+    ]
+
+
+def test_cleaning_plan_compiled_once_per_class():
+    assert SampleDataSet.cleaning_plan() is SampleDataSet.cleaning_plan()
+    assert isinstance(SampleDataSet.cleaning_plan(), CleaningPlan)
+    assert DataSet.cleaning_plan() is not SampleDataSet.cleaning_plan()
+
+
+def test_clean_dataframe(sample_data):
+    dataset = SampleDataSet(sample_data)
+
+    assert list(dataset.df.id) == [1, 6]
+    assert dataset.df.price.dtype == 'float'
+    assert dataset.df.reviews.dtype == 'float'
+    assert np.isnan(dataset.df.reviews.iloc[1])
+
+
+def test_clean_dataframe_counts(sample_data):
+    dataset = SampleDataSet(sample_data)
+
+    assert dataset.meta['loaded_data']['count_raw'] == 6
+    assert dataset.meta['loaded_data']['count_removed'] == 4
+    assert dataset.meta['loaded_data']['count_clean'] == 2
+    assert dataset.meta['loaded_data']['count_removed_by_rule'] == {
+        'drop_empty_strings:name': 2,
+        'drop_na:price': 2,
+    }
+
+
+def test_clean_dataframe_counts_chunks(sample_data):
+    dataset = SampleDataSet(iter([sample_data[:3], sample_data[3:]]))
+
+    assert list(dataset.df.id) == [1, 6]
+    assert dataset.meta['loaded_data']['count_removed'] == 4
+    assert dataset.meta['loaded_data']['count_removed_by_rule'] == {
+        'drop_empty_strings:name': 2,
+        'drop_na:price': 2,
+    }
+
+
+def test_clean_dataframe_nothing_to_clean():
+    dataset = DataSet([{'id': 1}, {'id': 2}])
+
+    assert len(dataset.df.index) == 2
+    assert dataset.meta['loaded_data']['count_removed_by_rule'] == {}
+
+
+@pytest.fixture()
+def uniform_data():
+    return [
+        {'id': 1, 'price': '100', 'name': 'one', 'reviews': 10.0},
+        {'id': 2, 'price': '', 'name': 'two', 'reviews': 0.0},
+        {'id': 3, 'price': '300', 'name': '', 'reviews': None},
+        {'id': 4, 'price': None, 'name': 'four', 'reviews': 5.0},
+        {'id': 6, 'price': '600', 'name': 'six', 'reviews': 0.0},
+    ]
+
+
+@pytest.mark.parametrize('kind', ['table', 'batch', 'reader', 'batches'])
+def test_arrow_input(uniform_data, kind):
+    pa = pytest.importorskip('pyarrow')
+    table = pa.Table.from_pylist(uniform_data)
+    data = {
+        'table': table,
+        'batch': pa.RecordBatch.from_pylist(uniform_data),
+        'reader': pa.RecordBatchReader.from_batches(table.schema, table.to_batches(max_chunksize=2)),
+        'batches': iter(table.to_batches(max_chunksize=2)),
+    }[kind]
+    expected = SampleDataSet(uniform_data)
+
+    dataset = SampleDataSet(data)
+
+    assert dataset.df.reset_index(drop=True).equals(expected.df.reset_index(drop=True))
+    assert dataset.meta['loaded_data']['count_raw'] == 5
+    assert dataset.meta['loaded_data']['count_removed_by_rule'] == expected.meta['loaded_data']['count_removed_by_rule']
+
+
+def test_dataframe_input_is_not_modified(uniform_data):
+    df = pd.DataFrame(uniform_data)
+    original = df.copy()
+
+    dataset = SampleDataSet(df)
+
+    assert df.equals(original)
+    assert list(dataset.df.id) == [1, 6]
+    assert dataset.meta['loaded_data']['count_raw'] == 5
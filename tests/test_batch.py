@@ -0,0 +1,89 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from seller_stats.batch import BatchResult, get_loader, process_source, run_batch
+from seller_stats.utils.loaders import CsvLoader, ScrapinghubLoader
+from seller_stats.utils.transformers import WildsearchCrawlerWildberriesTransformer
+
+
+@pytest.fixture()
+def empty_csv_file_path(tmp_path, sample_csv_file_path):
+    path = tmp_path / 'empty.csv'
+    path.write_text(open(sample_csv_file_path).readline())
+
+    return str(path)
+
+
+def test_get_loader(sample_csv_file_path, monkeypatch):
+    monkeypatch.setenv('SH_APIKEY', 'dummy_scrapinghub_key')
+
+    assert type(get_loader('414324/1/735')) is ScrapinghubLoader
+    assert type(get_loader(sample_csv_file_path)) is CsvLoader
+
+
+def test_process_source_csv(sample_csv_file_path):
+    result = process_source(sample_csv_file_path, transformer=WildsearchCrawlerWildberriesTransformer(), hhi_by=('brand_name', 'unknown'))
+
+    assert type(result) is BatchResult
+    assert result.error is None
+    assert result.category_name == 'Подставки кухонные'
+    assert result.count_raw == 440
+    assert result.sku == 440
+    assert list(result.hhi.keys()) == ['brand_name', 'unknown']
+    assert result.hhi['unknown'] is None
+    assert result.warnings == ('HHI field not found: unknown',)
+    assert len(result.distribution['bin_labels']) == 6
+
+
+def test_process_source_csv_extra_hhi_field(sample_csv_file_path, tmp_path):
+    df = pd.read_csv(sample_csv_file_path)
+    df['seller'] = ['Продавец 1', 'Продавец 2'] * (len(df.index) // 2)
+    df.to_csv(tmp_path / 'sellers.csv', index=False)
+
+    result = process_source(str(tmp_path / 'sellers.csv'), transformer=WildsearchCrawlerWildberriesTransformer(),
+                            hhi_by=('brand_name', 'seller'))
+
+    assert result.hhi['seller'] == pytest.approx(5000, rel=.2)
+    assert result.warnings == ()
+
+
+def test_process_source_scrapinghub(set_scrapinghub_requests_mock, monkeypatch):
+    monkeypatch.setenv('SH_APIKEY', 'dummy_scrapinghub_key')
+    set_scrapinghub_requests_mock(job_id='414324/1/735')
+
+    result = process_source('414324/1/735', transformer=WildsearchCrawlerWildberriesTransformer())
+
+    assert result.error is None
+    assert result.count_raw == 440
+
+
+def test_process_source_errors_are_isolated(empty_csv_file_path):
+    result = process_source(empty_csv_file_path, transformer=WildsearchCrawlerWildberriesTransformer())
+
+    assert result.error.startswith('BadDataSet')
+    assert result.category_name is None
+    assert result.count_raw is None
+    assert result.turnover_month is None
+    assert result.hhi is None
+    assert result.distribution is None
+
+
+def test_run_batch(sample_csv_file_path, empty_csv_file_path):
+    sources = [sample_csv_file_path, empty_csv_file_path, '/not/existing.csv', sample_csv_file_path]
+    now = datetime.datetime(2020, 6, 1)
+
+    results = run_batch(sources, transformer=WildsearchCrawlerWildberriesTransformer(), workers=2, now=now)
+
+    assert [result.source for result in results] == sources
+    assert results[0].error is None
+    assert results[0] == results[3]
+    assert results[1].error.startswith('BadDataSet')
+    assert results[2].error.startswith('FileNotFoundError')
+
+
+def test_run_batch_in_process(sample_csv_file_path):
+    results = run_batch([sample_csv_file_path], transformer=WildsearchCrawlerWildberriesTransformer(), workers=1)
+
+    assert results[0].error is None
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from benchmarks.import_time import measure
+from benchmarks.run import main
+from benchmarks.synthetic import LAYOUTS, generate_category_lists, generate_items
+from seller_stats.category_stats import CategoryStats
+from seller_stats.utils.transformers import (MpstatsWildbserriesTransformer, WildsearchCrawlerOzonTransformer,
+                                             WildsearchCrawlerWildberriesTransformer)
+
+
+@pytest.mark.parametrize('layout, transformer', [
+    ['wb', WildsearchCrawlerWildberriesTransformer()],
+    ['ozon', WildsearchCrawlerOzonTransformer()],
+    ['mpstats', MpstatsWildbserriesTransformer()],
+])
+def test_generate_items(layout, transformer):
+    items = generate_items(layout=layout, count=500, seed=1)
+
+    assert len(items) == 500
+    assert items == generate_items(layout=layout, count=500, seed=1)
+
+    stats = CategoryStats([transformer.transform_item(item) for item in items])
+
+    assert len(stats.df.index) == 500
+    assert stats.df.price.notna().sum() > 0
+
+
+def test_generate_category_lists():
+    old, new = generate_category_lists(count=100, changed_share=.2)
+
+    assert len(old) == len(new) == 100
+    assert len({item['category_url'] for item in old} & {item['category_url'] for item in new}) == 80
+
+
+def test_benchmark_run(tmp_path):
+    output = tmp_path / 'benchmark.json'
+
+    main(['--sizes', '200', '--repeat', '2', '--no-memory', '--output', str(output)])
+
+    report = json.loads(output.read_text())
+    stages = {(result['layout'], result['stage']) for result in report['results']}
+
+    assert 'pandas' in report['meta']
+    assert ('categories', 'category_list_updates.calculate_diff') in stages
+
+    for layout in LAYOUTS:
+        assert (layout, 'csv_loader.load') in stages
+        assert (layout, 'scrapinghub_loader.load') in stages
+        assert (layout, 'category_stats') in stages
+        assert (layout, 'calc_sales_distribution') in stages
+
+    for result in report['results']:
+        assert result['seconds'] > 0
+        assert result['peak_memory_bytes'] is None
+
+    # мемоизированные стадии должны считаться заново в каждом прогоне
+    cached = [result for result in report['results'] if result['stage'].startswith('calc_')]
+
+    assert len(cached) > 0
+    assert [result['cache_hits'] for result in cached] == [0] * len(cached)
+
+
+@pytest.mark.parametrize('module', [
+    'seller_stats.category_stats',
+    'seller_stats.batch',
+    'seller_stats.category_updates',
+])
+def test_import_does_not_load_clients(module):
+    assert measure(f'import {module}', repeat=1)['loaded'] == []
@@ -1,10 +1,12 @@
 import csv
 import datetime
 
+import pandas as pd
 import pytest
 from freezegun import freeze_time
 
-from seller_stats.category_stats import CategoryStats, calc_hhi, calc_sales_distribution
+from seller_stats.category_stats import (CategoryStats, calc_hhi, calc_hhi_batch, calc_sales_distribution,
+                                         calc_sales_distributions)
 from seller_stats.exceptions import BadDataSet
 from seller_stats.utils.loaders import ScrapinghubLoader
 from seller_stats.utils.transformers import WildsearchCrawlerOzonTransformer, WildsearchCrawlerWildberriesTransformer
@@ -79,6 +81,28 @@ def test_check_dataframe_correct_wb(sample_wb_category_data, caplog):
     assert len(stats.df.index) == 440
 
 
+def test_category_stats_from_chunks(set_scrapinghub_requests_mock, sample_wb_category_data, scrapinghub_client):
+    stats = CategoryStats(sample_wb_category_data())
+
+    loader = ScrapinghubLoader(job_id='414324/1/735', client=scrapinghub_client, transformer=WildsearchCrawlerWildberriesTransformer())
+    chunked_stats = CategoryStats(loader.iter_chunks(size=100))
+
+    assert len(chunked_stats.df.index) == len(stats.df.index)
+    assert chunked_stats.meta['loaded_data']['count_raw'] == 440
+    assert chunked_stats.meta['loaded_data']['count_clean'] == stats.meta['loaded_data']['count_clean']
+    assert chunked_stats.df.turnover.sum() == stats.df.turnover.sum()
+    assert chunked_stats.category_name() == stats.category_name()
+
+
+def test_category_stats_from_chunks_missing_fields_warned_once(sample_category_data):
+    data = sample_category_data('scrapinghub_items_wb_transformed', fieldnames=['id', 'price'])
+    chunks = iter([data[:100], data[100:200], data[200:]])
+
+    stats = CategoryStats(chunks)
+
+    assert len(stats.meta['loaded_data']['warnings']) == 1
+
+
 def test_category_stats_empty():
     with pytest.raises(BadDataSet) as error_info:
         CategoryStats(data=[])
@@ -102,6 +126,46 @@ def test_category_stats_get_category_url_wb(sample_wb_category_data):
     assert stats.category_url() == 'https://www.wildberries.ru/catalog/dom-i-dacha/kuhnya/poryadok-na-kuhne/podstavki-kuhonnye'
 
 
+def test_category_stats_compact(sample_category_data):
+    now = datetime.datetime(2020, 6, 1)
+
+    stats = CategoryStats(sample_category_data(), now=now)
+    compact_stats = CategoryStats(sample_category_data(), now=now, compact=True)
+
+    assert 'memory' not in stats.meta
+    assert compact_stats.meta['memory']['bytes_after'] < compact_stats.meta['memory']['bytes_before']
+
+    assert compact_stats.df.brand_name.dtype == 'category'
+    assert compact_stats.df.name.dtype == 'object'
+    assert compact_stats.df.price.dtype == 'float32'
+
+    assert compact_stats.category_name() == stats.category_name()
+    assert compact_stats.df.turnover_month.sum() == pytest.approx(stats.df.turnover_month.sum())
+    assert calc_hhi(compact_stats, by='brand_name') == pytest.approx(calc_hhi(stats, by='brand_name'))
+
+
+def test_category_stats_compact_keeps_unsafe_floats(sample_category_data):
+    data = sample_category_data()
+    data[0]['price'] = '356.123456789'
+
+    stats = CategoryStats(data, compact=True)
+
+    assert stats.df.price.dtype == 'float64'
+    assert stats.df.loc[0, 'price'] == 356.123456789
+
+
+def test_category_stats_compact_keeps_turnover_precision(sample_category_data):
+    data = sample_category_data()
+    data[0].update({'price': '35999', 'purchases': '12345'})
+
+    stats = CategoryStats(data, now=datetime.datetime(2020, 6, 1))
+    compact_stats = CategoryStats(data, now=datetime.datetime(2020, 6, 1), compact=True)
+
+    assert compact_stats.df.price.dtype == 'float32'
+    assert compact_stats.df.loc[0, 'turnover'] == 444407655.0
+    assert compact_stats.df.turnover_month.sum() == stats.df.turnover_month.sum()
+
+
 def test_calculate_basic_stats(sample_category_stats):
     stats = sample_category_stats.calculate_basic_stats()
 
@@ -124,6 +188,38 @@ def test_calculate_monthly_stats(sample_category_data):
     assert stats.df.loc[0, ].days_since_first_review == 89.0
 
 
+def test_calculate_monthly_stats_injected_now(sample_category_data):
+    stats = CategoryStats(sample_category_data(), now=datetime.datetime(2020, 6, 1))
+
+    assert stats.df.loc[0, ].turnover_month == 24000
+    assert stats.df.loc[0, ].days_since_first_review == 89.0
+
+    stats.calculate_monthly_stats(now=datetime.datetime(2020, 7, 1))
+
+    assert stats.df.loc[0, ].days_since_first_review == 119.0
+
+
+def test_calculate_monthly_stats_recent_and_empty_reviews(sample_category_data):
+    data = sample_category_data()[:3]
+    data[1]['first_review'] = '2020-05-15T10:00:00+03:00'
+    data[2]['first_review'] = ''
+
+    stats = CategoryStats(data, now=datetime.datetime(2020, 6, 1))
+
+    assert stats.df.loc[0, ].days_since_first_review == 89.0
+    assert stats.df.loc[1, ['days_since_first_review', 'turnover_month', 'purchases_month']].isna().all()
+    assert stats.df.loc[2, ['days_since_first_review', 'turnover_month', 'purchases_month']].isna().all()
+
+
+def test_calculate_monthly_stats_duplicated_ids(sample_category_data):
+    data = sample_category_data()[:2]
+    data[1]['id'] = data[0]['id']
+
+    stats = CategoryStats(data, now=datetime.datetime(2020, 6, 1))
+
+    assert len(stats.df.index) == 2
+
+
 def test_price_distribution(sample_category_stats):
     distribution = calc_sales_distribution(sample_category_stats)
 
@@ -135,6 +231,88 @@ def test_price_distribution(sample_category_stats):
     assert 'purchases_month' in list(distribution.df.columns)
 
 
+def test_category_stats_upsert(sample_category_data):
+    now = datetime.datetime(2020, 6, 1)
+    data = sample_category_data()
+
+    # последние 100 товаров новые, еще 100 обновились
+    updates = sample_category_data()[240:]
+    for item in updates[:100]:
+        item['purchases'] = str(int(item['purchases']) + 10)
+
+    stats = CategoryStats(data[:340], now=now).upsert(updates)
+    expected = CategoryStats(data[:240] + updates, now=now)
+
+    assert len(stats.df.index) == len(expected.df.index) == 440
+    assert stats.df.turnover_month.sum() == pytest.approx(expected.df.turnover_month.sum())
+
+    for field in stats.aggregates.fields:
+        assert stats.aggregates.sums[field] == pytest.approx(expected.df[field].sum())
+
+    assert calc_hhi(stats, by='brand_name') == pytest.approx(calc_hhi(expected, by='brand_name'))
+
+
+def test_category_stats_append(sample_category_data):
+    now = datetime.datetime(2020, 6, 1)
+    data = sample_category_data()
+
+    stats = CategoryStats(data[:200], now=now).append(data[200:])
+    expected = CategoryStats(data, now=now)
+
+    assert len(stats.df.index) == 440
+    assert stats.aggregates.sums['turnover'] == pytest.approx(expected.df.turnover.sum())
+    assert calc_hhi(stats, by='brand_name') == pytest.approx(calc_hhi(expected, by='brand_name'))
+
+
+def test_calc_hhi_running_aggregates_match_groupby(sample_category_stats):
+    total_market = sample_category_stats.df.turnover_month.sum()
+    shares = sample_category_stats.df.groupby('brand_name').turnover_month.sum() / total_market * 100
+
+    assert calc_hhi(sample_category_stats, by='brand_name') == pytest.approx((shares * shares).sum())
+
+
+def test_price_distribution_keeps_stats_intact(sample_category_stats):
+    columns = list(sample_category_stats.df.columns)
+
+    calc_sales_distribution(sample_category_stats)
+
+    assert list(sample_category_stats.df.columns) == columns
+
+
+def test_price_distributions_many_categories(sample_category_data):
+    now = datetime.datetime(2020, 6, 1)
+    data = sample_category_data()
+
+    for i, item in enumerate(data):
+        item['category_name'] = ['first', 'second', 'third'][i % 3]
+
+        # цены второй категории на порядок выше, чтобы у нее были свои интервалы
+        if i % 3 == 1 and item['price'] != '':
+            item['price'] = str(float(item['price']) * 20)
+
+    distributions = calc_sales_distributions(CategoryStats(data, now=now).df, by='category_name')
+
+    assert len(distributions.df.index) == 3 * 6
+
+    for category in ['first', 'second', 'third']:
+        expected = calc_sales_distribution(CategoryStats([item for item in data if item['category_name'] == category], now=now))
+        distribution = distributions.df[distributions.df.category_name == category].reset_index(drop=True)
+
+        assert list(distribution.bin.astype(str)) == list(expected.df.bin.astype(str))
+        assert list(distribution.bin_labels) == list(expected.df.bin_labels)
+        assert list(distribution.sku) == list(expected.df.sku)
+        assert list(distribution.turnover_month) == pytest.approx(list(expected.df.turnover_month))
+        assert list(distribution.purchases_month) == pytest.approx(list(expected.df.purchases_month))
+
+
+def test_price_distributions_without_categories(sample_category_stats):
+    distributions = calc_sales_distributions(sample_category_stats.df.assign(category_name=None), by='category_name')
+    expected = calc_sales_distributions(sample_category_stats.df.assign(category_name='first'), by='category_name')
+
+    assert len(distributions.df.index) == 0
+    assert list(distributions.df.columns) == list(expected.df.columns)
+
+
 @pytest.mark.parametrize('sample_file, hhi_expected', [
     ['hhi_sample_rand', 4054.5274397509397],
     ['hhi_sample_monopoly', 10000],
@@ -147,3 +325,93 @@ def test_calc_hhi(sample_file, hhi_expected, sample_category_data):
     hhi = calc_hhi(stats=stats, by='brand')
 
     assert round(hhi) == round(hhi_expected)
+
+
+def _groupby_hhi(df, by):
+    shares = df.groupby(by).turnover_month.sum() / df.turnover_month.sum() * 100
+
+    return (shares * shares).sum()
+
+
+def test_calc_hhi_batch(sample_category_stats):
+    fields = ('brand_name', 'brand_country', 'manufacture_country')
+
+    hhi = calc_hhi_batch(sample_category_stats, by=fields)
+
+    assert list(hhi.keys()) == list(fields)
+
+    for field in fields:
+        assert hhi[field] == pytest.approx(_groupby_hhi(sample_category_stats.df, field))
+
+
+def test_calc_hhi_batch_group_by(sample_category_data):
+    data = sample_category_data()
+    for item in data[:150]:
+        item['category_name'] = 'Другая категория'
+
+    stats = CategoryStats(data)
+    fields = ('brand_name', 'manufacture_country')
+
+    hhi = calc_hhi_batch(stats, by=fields, group_by='category_name')
+
+    assert type(hhi) is pd.DataFrame
+    assert sorted(hhi.index) == sorted(stats.df.category_name.unique())
+    assert list(hhi.columns) == list(fields)
+
+    for category, df_category in stats.df.groupby('category_name'):
+        for field in fields:
+            assert hhi.loc[category, field] == pytest.approx(_groupby_hhi(df_category, field))
+
+
+def test_derived_results_cached(sample_category_data):
+    stats = CategoryStats(sample_category_data())
+
+    distribution = calc_sales_distribution(stats)
+    hhi = calc_hhi(stats, by='brand_name')
+
+    assert calc_sales_distribution(stats=stats) is distribution
+    assert calc_hhi(stats=stats, by='brand_name') == hhi
+    assert calc_hhi_batch(stats, by=['brand_name']) == calc_hhi_batch(stats, by=('brand_name',))
+    assert stats.category_name() == stats.category_name()
+    assert stats.cache_info() == {'hits': 4, 'misses': 4, 'size': 4}
+
+
+def test_derived_results_invalidated(sample_category_data):
+    data = sample_category_data()
+    stats = CategoryStats(data[:200])
+
+    distribution = calc_sales_distribution(stats)
+    stats.append(data[200:])
+
+    assert calc_sales_distribution(stats) is not distribution
+    assert calc_sales_distribution(stats).df.sku.sum() == calc_sales_distribution(CategoryStats(data)).df.sku.sum()
+
+    assert calc_hhi_batch(stats, by=('brand_name',))['brand_name'] < 10000
+
+    stats.df['brand_name'] = 'Один бренд'
+
+    assert calc_hhi_batch(stats, by=('brand_name',))['brand_name'] == pytest.approx(10000)
+
+    # значения, измененные на месте, требуют явного сброса
+    stats.df.loc[:, 'brand_name'] = 'Другой бренд'
+    calc_hhi_batch(stats, by=('brand_name',))
+    stats.invalidate()
+    calc_hhi_batch(stats, by=('brand_name',))
+
+    assert stats.cache_info() == {'hits': 2, 'misses': 5, 'size': 1}
+
+
+def test_calc_hhi_after_frame_change(sample_category_data):
+    stats = CategoryStats(sample_category_data())
+    brand = stats.df.brand_name.iloc[0]
+
+    assert calc_hhi(stats, by='brand_name') < 10000
+
+    stats.df = stats.df[stats.df.brand_name == brand]
+
+    assert calc_hhi(stats, by='brand_name') == pytest.approx(10000)
+    assert stats.get_aggregates().sums['sku'] == len(stats.df.index)
+
+    stats.df['brand_name'] = stats.df['brand_name'].where(stats.df.index % 2 == 0, 'Другой бренд')
+
+    assert calc_hhi(stats, by='brand_name') == pytest.approx(calc_hhi_batch(stats, by=('brand_name',))['brand_name'])
@@ -0,0 +1,265 @@
+import io
+
+import pandas as pd
+import pytest
+from faker import Faker
+
+from seller_stats.category_updates import CategoryListUpdates
+from seller_stats.utils.snapshots import CategorySnapshotStore
+
+fake = Faker()
+Faker.seed(0)
+
+
+def make_categories(len_1, len_2, diff_count):
+    lists = [[], []]
+
+    # заполняем первый лист (старые категории)
+    for _ in range(len_1):
+        lists[0].append({
+            'category_name': fake.company(),
+            'category_url': fake.url(),
+        })
+
+    # заполняем второй лист категориями, которые должны совпадать
+    for i in range(len_2 - diff_count):
+        lists[1].append(lists[0][i])
+
+    # добиваем второй лист категориями, которые должны отличаться
+    for _ in range(len_2 - len(lists[1])):
+        lists[1].append({
+            'category_name': fake.company(),
+            'category_url': fake.url(),
+        })
+
+    return lists
+
+
+def merge_diff(df_left, df_right):
+    df_diff = pd.merge(df_left, df_right, how='outer', indicator=True)
+
+    return df_diff.loc[df_diff._merge == 'left_only', ['category_name', 'category_url']]
+
+
+def full_diff(df_old, df_new):
+    df = pd.concat([df_old, df_new]).reset_index(drop=True)
+    diff_indexes = [x[0] for x in df.groupby(list(df.columns)).groups.values() if len(x) == 1]
+
+    return df.reindex(diff_indexes).groupby('category_url', as_index=False).first()
+
+
+@pytest.mark.parametrize('lists, diff_added_cnt, diff_removed_cnt, diff_full_cnt', [
+    [make_categories(1, 2, 1), 1, 0, 1],  # когда есть одна новая категория
+    [make_categories(1, 2, 2), 2, 1, 3],  # когда все категории новые
+    [make_categories(10, 10, 0), 0, 0, 0],  # когда все категории старые
+    [make_categories(10, 5, 5), 5, 10, 15],  # когда категорий меньше и все новые
+    [make_categories(10, 5, 0), 0, 5, 5],  # когда категорий меньше и все старые
+])
+def test_calculate_diff_counts(lists, diff_added_cnt, diff_removed_cnt, diff_full_cnt):
+    comparator = CategoryListUpdates(lists[0], lists[1])
+    comparator.calculate_diff()
+
+    assert comparator.get_categories_count('added') == diff_added_cnt
+    assert comparator.get_categories_count('removed') == diff_removed_cnt
+    assert comparator.get_categories_count('full') == diff_full_cnt
+
+
+def test_calculate_diff_matches_merges():
+    old, new = make_categories(200, 150, 60)
+
+    # дубли и повторяющиеся названия с разными адресами
+    new += new[:5]
+    old += [{'category_name': old[0]['category_name'], 'category_url': fake.url()}]
+
+    comparator = CategoryListUpdates(old, new).calculate_set_diff()
+
+    df_old = pd.DataFrame(old, columns=['category_name', 'category_url'])
+    df_new = pd.DataFrame(new, columns=['category_name', 'category_url'])
+
+    expected = {
+        'added': merge_diff(df_new, df_old),
+        'removed': merge_diff(df_old, df_new),
+        'full': full_diff(df_old, df_new),
+    }
+
+    for _type, df_expected in expected.items():
+        pd.testing.assert_frame_equal(comparator.diff[_type].reset_index(drop=True), df_expected.reset_index(drop=True))
+
+        df_expected_unique = df_expected.groupby('category_name', as_index=False).first()
+        pd.testing.assert_frame_equal(comparator.diff_unique[_type], df_expected_unique)
+
+
+def test_calculate_diff_sorted_by_type():
+    old, new = make_categories(5, 10, 8)
+    new[-1]['category_url'] = 'https://www.wildberries.ru/catalog/novinki/'
+    new[-2]['category_url'] = 'https://www.wildberries.ru/promotions/sale'
+
+    comparator = CategoryListUpdates(old, new)
+    comparator.calculate_diff()
+
+    assert list(comparator.diff['added'].category_type) == sorted(comparator.diff['added'].category_type)
+    assert comparator.diff['added'].category_type.iloc[0] == 'Новинки'
+
+
+class FakeJob:
+    def __init__(self, items):
+        self.items = self
+        self._items = items
+
+    def iter(self):
+        return iter(self._items)
+
+
+class FakeClient:
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.fetched = []
+
+    def get_job(self, job_key):
+        self.fetched.append(job_key)
+
+        return FakeJob(self.jobs[job_key])
+
+
+class FakeProject:
+    def __init__(self, summaries):
+        self.jobs = self
+        self.summaries = summaries
+
+    def iter(self, **kwargs):
+        return iter(self.summaries)
+
+
+def to_items(categories):
+    return [{'wb_category_name': c['category_name'], 'wb_category_url': c['category_url']} for c in categories]
+
+
+def test_load_from_api_with_store(tmp_path):
+    lists = make_categories(20, 20, 5)
+    third = lists[1][5:]
+    client = FakeClient({'1/1/1': to_items(lists[0]), '1/1/2': to_items(lists[1]), '1/1/3': to_items(third)})
+    store = CategorySnapshotStore(str(tmp_path))
+
+    updates = CategoryListUpdates().load_from_api(client, FakeProject([
+        {'key': '1/1/2', 'finished_time': 1583020800000},
+        {'key': '1/1/1', 'finished_time': 1582934400000},
+    ]), store=store)
+    updates.calculate_set_diff()
+
+    assert updates.get_categories_count('added') == 5
+    assert updates.get_categories_count('removed') == 5
+    assert client.fetched == ['1/1/1', '1/1/2']
+
+    # следующий день: предыдущий список берется из хранилища
+    updates = CategoryListUpdates().load_from_api(client, FakeProject([
+        {'key': '1/1/3', 'finished_time': 1583107200000},
+        {'key': '1/1/2', 'finished_time': 1583020800000},
+    ]), store=store)
+    updates.calculate_set_diff()
+
+    assert client.fetched == ['1/1/1', '1/1/2', '1/1/3']
+    assert updates.get_categories_count('removed') == 5
+    assert updates.get_categories_count('added') == 0
+
+    # сравнение с более ранним днем без обращения к API
+    updates = CategoryListUpdates().load_from_snapshots(store, store.key_for_date('2020-02-29'))
+    updates.calculate_set_diff()
+
+    assert store.keys() == ['1/1/1', '1/1/2', '1/1/3']
+    assert updates.get_categories_count('removed') == 10
+    assert updates.get_categories_count('added') == 5
+
+
+def test_load_from_snapshots_missing_key(tmp_path):
+    store = CategorySnapshotStore(str(tmp_path))
+
+    with pytest.raises(ValueError, match='not found in the store'):
+        CategoryListUpdates().load_from_snapshots(store, '1/1/1')
+
+    store.put('1/1/1', make_categories(10, 10, 0)[0], finished_time=1582934400000)
+
+    with pytest.raises(ValueError, match='old_key=None'):
+        CategoryListUpdates().load_from_snapshots(store, store.key_for_date('2020-02-01'))
+
+    with pytest.raises(ValueError, match='new_key=1/1/2'):
+        CategoryListUpdates().load_from_snapshots(store, '1/1/1', '1/1/2')
+
+
+@pytest.mark.parametrize('summaries', [
+    [{'key': '1/1/3', 'finished_time': 1583107200000}, {'key': '1/1/2', 'finished_time': 1583020800000}],
+    [{'key': '1/1/2', 'finished_time': 1583020800000}, {'key': '1/1/3', 'finished_time': 1583107200000}],
+    [{'key': '1/1/3'}, {'key': '1/1/2'}],
+])
+def test_load_from_api_job_order(tmp_path, summaries):
+    lists = make_categories(20, 20, 5)
+    client = FakeClient({'1/1/2': to_items(lists[1]), '1/1/3': to_items(lists[1][5:])})
+
+    for store in [None, CategorySnapshotStore(str(tmp_path))]:
+        updates = CategoryListUpdates().load_from_api(client, FakeProject(summaries), store=store)
+        updates.calculate_set_diff()
+
+        assert updates.get_categories_count('removed') == 5
+        assert updates.get_categories_count('added') == 0
+
+
+def test_snapshot_store_persists_index(tmp_path):
+    lists = make_categories(10, 10, 0)
+    CategorySnapshotStore(str(tmp_path)).put('1/1/1', lists[0], finished_time=1582934400000)
+
+    store = CategorySnapshotStore(str(tmp_path))
+
+    assert '1/1/1' in store
+    assert store.index['1/1/1']['date'] == '2020-02-29'
+    assert store.key_for_date('2020-02-28') is None
+    assert store.get('1/1/1').to_dict('records') == lists[0]
+    assert store.get('1/1/2') is None
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+
+    def upload_fileobj(self, fileobj, bucket, key, Config=None):  # noqa: N803
+        self.objects[(bucket, key)] = fileobj.read()
+
+
+@pytest.fixture()
+def comparator():
+    lists = make_categories(30, 30, 10)
+
+    comparator = CategoryListUpdates(lists[0], lists[1])
+    comparator.calculate_diff()
+
+    return comparator
+
+
+@pytest.mark.parametrize('file_format', ['csv', 'parquet'])
+def test_dump_to_s3(comparator, file_format):
+    client = FakeS3()
+
+    comparator.dump_to_s3(file_format=file_format, client=client, bucket='bucket')
+
+    assert len(client.objects) == 3
+
+    for _type in ['added', 'removed', 'full']:
+        file_name = comparator.get_s3_file_name(_type)
+        buffer = io.BytesIO(client.objects[('bucket', file_name)])
+        df = pd.read_csv(buffer) if file_format == 'csv' else pd.read_parquet(buffer)
+
+        assert file_name.startswith(f'{_type}_') and file_name.endswith(f'.{file_format}')
+        assert df['category_name'].tolist() == comparator.diff[_type]['category_name'].tolist()
+
+
+def test_dump_to_s3_file_xlsx(comparator):
+    pytest.importorskip('openpyxl')
+    client = FakeS3()
+
+    comparator.dump_to_s3_file('added', client=client, bucket='bucket')
+
+    assert comparator.get_s3_file_name('added').endswith('.xlsx')
+    assert len(pd.read_excel(io.BytesIO(client.objects[('bucket', comparator.get_s3_file_name('added'))]))) == 10
+
+
+def test_export_unknown_format(comparator):
+    with pytest.raises(ValueError):
+        comparator.export_to_buffer('added', file_format='json')
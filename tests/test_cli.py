@@ -0,0 +1,32 @@
+import pandas as pd
+
+from seller_stats.cli import main
+
+
+def test_main(sample_csv_file_path, tmp_path):
+    output = str(tmp_path / 'stats.parquet')
+
+    exit_code = main([sample_csv_file_path, sample_csv_file_path, '--transformer', 'wb', '--workers', '2', '--output', output])
+    df = pd.read_parquet(output)
+
+    assert exit_code == 0
+    assert len(df.index) == 2
+    assert df.category_name.tolist() == ['Подставки кухонные'] * 2
+    assert df.count_raw.tolist() == [440, 440]
+    assert 'hhi_brand_name' in df.columns
+    assert len(df.distribution_bin_labels[0]) == 6
+    assert 0 < sum(df.distribution_sku[0]) <= df.sku[0]
+
+
+def test_main_with_failed_source(sample_csv_file_path, tmp_path):
+    output = str(tmp_path / 'stats.parquet')
+
+    exit_code = main([sample_csv_file_path, str(tmp_path / 'missing.csv'), '--transformer', 'wb', '--workers', '1', '--output', output])
+    df = pd.read_parquet(output)
+
+    assert exit_code == 1
+    assert df.error.isna().tolist() == [True, False]
+    assert df.count_raw.count() == 1
+    assert df.turnover_month.mean() == df.turnover_month[0]
+    assert df.hhi_brand_name.isna().tolist() == [False, True]
+    assert df.distribution_sku[1] is None
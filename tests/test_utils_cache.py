@@ -0,0 +1,94 @@
+import os
+
+import pandas as pd
+import pytest
+
+from seller_stats.category_stats import CategoryStats
+from seller_stats.utils.cache import ItemCache
+from seller_stats.utils.loaders import ScrapinghubLoader
+from seller_stats.utils.transformers import Transformer, WildsearchCrawlerWildberriesTransformer
+
+
+@pytest.fixture()
+def cache(tmp_path):
+    return ItemCache(path=str(tmp_path / 'cache'))
+
+
+@pytest.fixture()
+def sample_df():
+    return pd.DataFrame(data={
+        'id': [1, 2, 3],
+        'name': ['one', 'two', None],
+        'price': [100.0, 200.5, None],
+        'image_urls': [['a', 'b'], [], ['c']],
+    })
+
+
+def test_cache_miss_and_hit(cache, sample_df):
+    assert cache.get('414324/1/735') is None
+
+    cache.put('414324/1/735', sample_df)
+    table = cache.get('414324/1/735')
+    df = table.to_pandas()
+
+    assert table.num_rows == 3
+
+    assert list(df.columns) == list(sample_df.columns)
+    assert list(df.id) == [1, 2, 3]
+    assert df.name.isna().sum() == 1
+    assert list(df.image_urls[0]) == ['a', 'b']
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'entries': 1, 'bytes': os.path.getsize(cache.get_path('414324/1/735'))}
+
+
+def test_cache_lru_eviction(cache, sample_df):
+    cache.put('1/1/1', sample_df)
+    entry_size = cache.size()
+    cache.max_bytes = entry_size * 2
+
+    cache.put('1/1/2', sample_df)
+
+    # первую запись читали последней, поэтому вытеснена будет вторая
+    os.utime(cache.get_path('1/1/2'), (0, 0))
+    cache.get('1/1/1')
+    cache.put('1/1/3', sample_df)
+
+    assert cache.get('1/1/2') is None
+    assert cache.get('1/1/1') is not None
+    assert cache.get('1/1/3') is not None
+    assert cache.size() <= cache.max_bytes
+
+
+def test_cache_skips_unconvertible_frames(cache):
+    cache.put('1/1/1', pd.DataFrame(data={'mixed': [1, 'one']}))
+
+    assert cache.get('1/1/1') is None
+
+
+def test_scrapinghub_loader_with_cache(set_scrapinghub_requests_mock, requests_mock, scrapinghub_client, cache):
+    set_scrapinghub_requests_mock(job_id='414324/1/735')
+    transformer = WildsearchCrawlerWildberriesTransformer()
+
+    df = ScrapinghubLoader(job_id='414324/1/735', client=scrapinghub_client, transformer=transformer, cache=cache).load_frame()
+    calls_count = requests_mock.call_count
+
+    cached_df = ScrapinghubLoader(job_id='414324/1/735', client=scrapinghub_client, transformer=transformer, cache=cache).load_frame()
+
+    assert requests_mock.call_count == calls_count
+    assert len(cached_df.index) == len(df.index) == 440
+    assert list(cached_df.columns) == list(df.columns)
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+    assert len(CategoryStats(cached_df).df.index) == len(CategoryStats(df).df.index)
+
+
+def test_scrapinghub_loader_cache_key_depends_on_rules(set_scrapinghub_requests_mock, scrapinghub_client, cache):
+    set_scrapinghub_requests_mock(job_id='414324/1/735')
+    renaming = Transformer(transform_rules={'product_name': 'name'})
+    dropping = Transformer(transform_rules={'product_name': 'name'}, drop_keys=['wb_id'])
+
+    renamed = ScrapinghubLoader(job_id='414324/1/735', client=scrapinghub_client, transformer=renaming, cache=cache).load_frame()
+    dropped = ScrapinghubLoader(job_id='414324/1/735', client=scrapinghub_client, transformer=dropping, cache=cache).load_frame()
+
+    assert 'wb_id' in renamed.columns
+    assert 'wb_id' not in dropped.columns
+    assert cache.stats()['entries'] == 2
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from seller_stats.category_stats import CategoryStats
+from seller_stats.category_updates import CategoryListUpdates
+from seller_stats.utils.categories import get_category_search_urls, get_category_types
+
+
+@pytest.fixture()
+def updates():
+    return CategoryListUpdates([], [])
+
+
+def test_search_urls_match_scalar_version(updates):
+    names = pd.Series(['Платья', 'Футболки & майки', 'Платья', '100% хлопок', 'a/b?c=d #1', np.nan])
+
+    urls = get_category_search_urls(names)
+
+    assert urls.iloc[:5].tolist() == [updates.generate_search_url(name) for name in names.iloc[:5]]
+    assert pd.isna(urls.iloc[5])
+
+
+def test_category_types_match_scalar_version(updates):
+    urls = pd.Series([
+        'https://www.wildberries.ru/catalog/novinki/zhenshchinam',
+        'https://www.wildberries.ru/promotions/skidki-dnya',
+        'https://www.wildberries.ru/catalog/zhenshchinam/odezhda',
+        'https://www.wildberries.ru/promotions/catalog/novinki/',
+    ])
+
+    assert get_category_types(urls).tolist() == [updates.generate_category_type(url) for url in urls]
+
+
+def test_category_types_custom_rules():
+    urls = pd.Series(['/catalog/novinki/a', '/brands/b', None])
+
+    types = get_category_types(urls, rules=[('/brands/', 'Бренд')], default='Прочее')
+
+    assert types.tolist() == ['Прочее', 'Бренд', 'Прочее']
+    assert get_category_types(urls, rules=[]).tolist() == ['Обычная'] * 3
+
+
+def test_enrich_category_stats_frame():
+    stats = CategoryStats(pd.DataFrame({
+        'id': [1, 2, 3],
+        'price': [100, 200, 300],
+        'purchases': [1, 2, 3],
+        'first_review': ['2020-01-01'] * 3,
+        'rating': [5, 4, 3],
+        'category_name': ['Платья', 'Платья', 'Новинки'],
+        'category_url': ['/catalog/platya', '/catalog/platya', '/catalog/novinki/platya'],
+    }), compact=True)
+
+    assert get_category_types(stats.df['category_url']).tolist() == ['Обычная', 'Обычная', 'Новинки']
+    assert get_category_search_urls(stats.df['category_name']).str.endswith('search=%D0%9F%D0%BB%D0%B0%D1%82%D1%8C%D1%8F')[0]
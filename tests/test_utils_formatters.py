@@ -1,7 +1,10 @@
+import numpy as np
+import pandas as pd
 import pytest
 
-from seller_stats.utils.formatters import (format_add_postfix, format_currency, format_number, format_percent,
-                                           format_quantity)
+from seller_stats.utils.formatters import (format_add_postfix, format_add_postfixes, format_currencies,
+                                           format_currency, format_number, format_numbers, format_percent,
+                                           format_percents, format_quantities, format_quantity)
 
 
 @pytest.mark.parametrize('number, expected', [
@@ -51,3 +54,34 @@ def test_format_quantity(number, expected):
 ])
 def test_format_add_postfix(number, postfix, highlighter, expected):
     assert format_add_postfix(number, postfix=postfix, highlighter=highlighter) == expected
+
+
+def test_bulk_formatters_match_scalar_ones():
+    rng = np.random.default_rng(0)
+    numbers = np.concatenate([
+        rng.normal(0, 1e6, 5000),
+        np.round(rng.normal(0, 100, 5000), 3),
+        [0, -0., .5, -.5, .005, -.005, 2.675, 1.005, 2.999, -2.999, .001, -.01, 999.999, 1e12 + .5, np.nan, np.inf],
+    ])
+    series = pd.Series(numbers)
+
+    assert format_numbers(numbers).tolist() == [format_number(number) for number in numbers.tolist()]
+    assert format_percents(series / 100).tolist() == (series / 100).map(format_percent).tolist()
+    assert format_currencies(series).tolist() == series.map(format_currency).tolist()
+    assert format_quantities(numbers).tolist() == [format_quantity(number) for number in numbers.tolist()]
+    assert format_add_postfixes(series, '', 'эээ').tolist() == [format_add_postfix(n, '', 'эээ') for n in numbers.tolist()]
+
+
+@pytest.mark.parametrize('numbers, expected', [
+    [np.array([11574747, -1000, 0]), ['11 574 747', '-1 000', '0']],
+    [pd.Series([1000, 22], index=[5, 6], dtype='int32'), ['1 000', '22']],
+    [[1, 2.5], ['1', '2,5']],
+])
+def test_format_numbers_keeps_container(numbers, expected):
+    formatted = format_numbers(numbers)
+
+    assert list(formatted) == expected
+    assert isinstance(formatted, pd.Series) == isinstance(numbers, pd.Series)
+
+    if isinstance(numbers, pd.Series):
+        assert formatted.index.tolist() == numbers.index.tolist()
@@ -0,0 +1,87 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from seller_stats.category_stats import CategoryStats
+from seller_stats.utils.history import SalesHistoryStore
+
+
+@pytest.fixture()
+def snapshot():
+    return pd.DataFrame({
+        'id': [1, 2, 3],
+        'price': [100, 10, 1],
+        'purchases': [10, 20, 30],
+        'category_name': 'Платья',
+    })
+
+
+@pytest.fixture()
+def store(tmp_path, snapshot):
+    store = SalesHistoryStore(str(tmp_path))
+
+    store.put(snapshot, date='2020-01-01')
+    store.put(snapshot.assign(purchases=[15, 22, 30]), date='2020-01-20')
+    store.put(pd.concat([
+        snapshot.assign(purchases=[25, 30, 31]),
+        pd.DataFrame({'id': [4], 'price': [7], 'purchases': [5], 'category_name': 'Платья'}),
+    ]), date='2020-02-05')
+    store.put(snapshot.assign(category_name='Обувь'), date='2020-02-05')
+
+    return store
+
+
+def test_partitions(store):
+    assert store.categories() == ['Обувь', 'Платья']
+    assert store.dates('Платья') == [datetime.date(2020, 1, 1), datetime.date(2020, 1, 20), datetime.date(2020, 2, 5)]
+    assert store.dates('Неизвестная') == []
+    assert len(store.load('Платья', start='2020-01-10').index) == 7
+
+
+@pytest.mark.parametrize('days, purchases, turnover, days_real', [
+    [30, [15, 10, 1, 0], [1500, 100, 1, 0], [35, 35, 35, 0]],
+    [7, [10, 8, 1, 0], [1000, 80, 1, 0], [16, 16, 16, 0]],
+])
+def test_sales(store, days, purchases, turnover, days_real):
+    sales = store.sales('Платья', days=days)
+
+    assert sales.id.tolist() == [1, 2, 3, 4]
+    assert sales.purchases.tolist() == purchases
+    assert sales.turnover.tolist() == turnover
+    assert sales.days.tolist() == days_real
+
+
+def test_sales_reads_only_needed_partitions(store, monkeypatch):
+    loaded = []
+    read_parquet = pd.read_parquet
+
+    def tracking_read_parquet(path, *args, **kwargs):
+        loaded.append(path)
+
+        return read_parquet(path, *args, **kwargs)
+
+    monkeypatch.setattr(pd, 'read_parquet', tracking_read_parquet)
+
+    store.sales('Платья', days=7)
+
+    assert len(loaded) == 2
+    assert all('date=2020-01-01' not in path for path in loaded)
+
+
+def test_sales_until_date(store):
+    sales = store.sales('Платья', days=30, end='2020-01-31')
+
+    assert sales.purchases.tolist() == [5, 2, 0]
+    assert (sales.date_to == pd.Timestamp('2020-01-20')).all()
+
+
+def test_put_category_stats(tmp_path, current_path):
+    stats = CategoryStats(pd.read_csv(current_path + '/mocks/scrapinghub_items_wb_transformed.csv'), now='2020-03-01')
+    store = SalesHistoryStore(str(tmp_path)).put(stats)
+
+    history = store.load(stats.category_name())
+
+    assert store.dates(stats.category_name()) == [datetime.date(2020, 3, 1)]
+    assert len(history.index) == len(stats.df.index)
+    assert history.id.is_monotonic_increasing
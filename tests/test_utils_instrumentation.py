@@ -0,0 +1,62 @@
+import datetime
+
+from seller_stats.category_stats import CategoryStats
+from seller_stats.utils.instrumentation import Instrumentation, instrumented
+from seller_stats.utils.loaders import CsvLoader
+from seller_stats.utils.transformers import WildsearchCrawlerWildberriesTransformer
+
+
+class Sample:
+    def __init__(self, instrumentation=None):
+        self.instrumentation = instrumentation
+
+    @instrumented('make_list')
+    def make_list(self, size):
+        return list(range(size))
+
+
+def test_instrumentation_stage():
+    records = []
+    instrumentation = Instrumentation(callback=records.append, trace_memory=True)
+
+    result = Sample(instrumentation=instrumentation).make_list(100000)
+
+    assert len(result) == 100000
+    assert instrumentation.records == records
+    assert records[0]['stage'] == 'make_list'
+    assert records[0]['rows_in'] is None
+    assert records[0]['rows_out'] == 100000
+    assert records[0]['seconds'] > 0
+    assert records[0]['memory_delta_bytes'] > 100000 * 8
+
+
+def test_instrumentation_without_memory_tracing():
+    instrumentation = Instrumentation()
+
+    Sample(instrumentation=instrumentation).make_list(10)
+
+    assert instrumentation.records[0]['memory_delta_bytes'] is None
+
+
+def test_instrumentation_disabled():
+    assert Sample().make_list(10) == list(range(10))
+
+
+def test_category_stats_timings(sample_csv_file_path):
+    instrumentation = Instrumentation()
+
+    loader = CsvLoader(file_path=sample_csv_file_path, transformer=WildsearchCrawlerWildberriesTransformer(), instrumentation=instrumentation)
+    stats = CategoryStats(loader.load(), now=datetime.datetime(2020, 6, 1), instrumentation=instrumentation)
+
+    stages = [record['stage'] for record in stats.meta['timings']]
+
+    assert stages == ['csv_load', 'check_dataframe', 'clean_dataframe', 'calculate_basic_stats', 'calculate_monthly_stats']
+    assert stats.meta['timings'][0]['rows_out'] == 440
+    assert stats.meta['timings'][2]['rows_in'] == 440
+    assert stats.meta['timings'][2]['rows_out'] == len(stats.df.index)
+
+
+def test_category_stats_without_timings(sample_csv_file_path):
+    stats = CategoryStats(CsvLoader(file_path=sample_csv_file_path, transformer=WildsearchCrawlerWildberriesTransformer()).load())
+
+    assert 'timings' not in stats.meta
@@ -1,19 +1,17 @@
+import asyncio
 from os import environ
 
+import pandas as pd
 import pytest
 import requests_mock
 from scrapinghub import ScrapinghubClient
 
+from seller_stats.category_stats import CategoryStats
 from seller_stats.exceptions import NotReady
-from seller_stats.utils.loaders import CsvLoader, ScrapinghubLoader
+from seller_stats.utils.loaders import AsyncScrapinghubLoader, CsvLoader, ScrapinghubLoader
 from seller_stats.utils.transformers import WildsearchCrawlerWildberriesTransformer
 
 
-@pytest.fixture()
-def sample_csv_file_path(current_path):
-    return current_path + '/mocks/scrapinghub_items_wb_raw.csv'
-
-
 def test_simple_scrapinghub_loader_init_throws_apikey_exception():
     with pytest.raises(Exception) as e_info:
         ScrapinghubLoader(job_id='123/4/5')
@@ -72,6 +70,37 @@ def test_scrapinghub_loader_with_transformer(set_scrapinghub_requests_mock, scra
     assert 'id' in data[0].keys()
 
 
+@pytest.mark.parametrize('size, chunks_count', [
+    [100, 5],
+    [440, 1],
+    [1000, 1],
+])
+def test_scrapinghub_loader_iter_chunks(size, chunks_count, set_scrapinghub_requests_mock, scrapinghub_client):
+    set_scrapinghub_requests_mock(job_id='414324/1/735')
+
+    transformer = WildsearchCrawlerWildberriesTransformer()
+    loader = ScrapinghubLoader(job_id='414324/1/735', client=scrapinghub_client, transformer=transformer)
+
+    chunks = list(loader.iter_chunks(size=size))
+
+    assert len(chunks) == chunks_count
+    assert sum(len(chunk.index) for chunk in chunks) == 440
+
+    for chunk in chunks:
+        assert type(chunk) is pd.DataFrame
+        assert len(chunk.index) <= size
+        assert 'id' in chunk.columns
+        assert 'wb_id' not in chunk.columns
+
+
+def test_scrapinghub_loader_iter_chunks_job_not_finished(scrapinghub_client):
+    with requests_mock.Mocker() as m:
+        m.get('https://storage.scrapinghub.com/jobs/123/1/2/state', text='"running"')
+
+        with pytest.raises(NotReady):
+            next(ScrapinghubLoader(job_id='123/1/2', client=scrapinghub_client).iter_chunks(size=10))
+
+
 def test_simple_csv_loader_init(sample_csv_file_path):
     loader = CsvLoader(file_path=sample_csv_file_path)
 
@@ -100,3 +129,84 @@ def test_csv_loader_with_transformer(sample_csv_file_path):
     assert 'wb_id' not in data[0].keys()
     assert 'name' in data[0].keys()
     assert 'id' in data[0].keys()
+
+
+def test_csv_loader_load_frame(sample_csv_file_path):
+    loader = CsvLoader(file_path=sample_csv_file_path, transformer=WildsearchCrawlerWildberriesTransformer())
+
+    df = loader.load_frame()
+
+    assert len(df.index) == 440
+    assert 'product_name' not in df.columns
+    assert 'image_urls' in df.columns
+    assert 'name' in df.columns
+    assert 'id' in df.columns
+
+
+def test_csv_loader_load_frame_for_dataset(sample_csv_file_path):
+    loader = CsvLoader(file_path=sample_csv_file_path, transformer=WildsearchCrawlerWildberriesTransformer())
+
+    df = loader.load_frame(dataset=CategoryStats)
+
+    assert set(df.columns) <= set(CategoryStats.fields_required + CategoryStats.fields_optional)
+    assert 'image_urls' not in df.columns
+
+    for field, field_type in CategoryStats.fields_force_types.items():
+        assert df[field].dtype == field_type
+
+
+def test_csv_loader_load_frame_matches_load(sample_csv_file_path):
+    transformer = WildsearchCrawlerWildberriesTransformer()
+
+    stats = CategoryStats(CsvLoader(file_path=sample_csv_file_path, transformer=transformer).load())
+    columnar_stats = CategoryStats(CsvLoader(file_path=sample_csv_file_path, transformer=transformer).load_frame(dataset=CategoryStats))
+
+    assert len(columnar_stats.df.index) == len(stats.df.index)
+    assert columnar_stats.df.turnover.sum() == stats.df.turnover.sum()
+    assert columnar_stats.category_name() == stats.category_name()
+
+
+def test_async_scrapinghub_loader(set_scrapinghub_requests_mock, requests_mock, scrapinghub_client):
+    set_scrapinghub_requests_mock(job_id='414324/1/735')
+    set_scrapinghub_requests_mock(job_id='414324/1/736')
+    requests_mock.get('https://storage.scrapinghub.com/jobs/414324/1/737/state', text='"running"')
+
+    transformer = WildsearchCrawlerWildberriesTransformer()
+    loader = AsyncScrapinghubLoader(job_ids=['414324/1/735', '414324/1/736', '414324/1/737'], client=scrapinghub_client, transformer=transformer, concurrency=2)
+
+    results = asyncio.run(loader.load())
+
+    assert [result.job_id for result in results] == ['414324/1/735', '414324/1/736', '414324/1/737']
+
+    for result in results[:2]:
+        assert result.error is None
+        assert len(result.df.index) == 440
+        assert 'id' in result.df.columns
+
+    assert type(results[2].error) is NotReady
+    assert results[2].df is None
+
+
+def test_async_scrapinghub_loader_keeps_passed_client_session(scrapinghub_client):
+    adapter = scrapinghub_client._hsclient.session.get_adapter('https://storage.scrapinghub.com')
+
+    AsyncScrapinghubLoader(job_ids=['123/4/5'], client=scrapinghub_client, concurrency=20)
+
+    assert scrapinghub_client._hsclient.session.get_adapter('https://storage.scrapinghub.com') is adapter
+
+
+def test_async_scrapinghub_loader_sizes_own_client_pool(monkeypatch):
+    monkeypatch.setenv('SH_APIKEY', 'fake_key')
+
+    loader = AsyncScrapinghubLoader(job_ids=['123/4/5'], concurrency=20)
+
+    assert loader.client._hsclient.session.get_adapter('https://storage.scrapinghub.com')._pool_maxsize == 20
+
+
+def test_async_scrapinghub_loader_init_throws_apikey_exception(monkeypatch):
+    monkeypatch.delenv('SH_APIKEY', raising=False)
+
+    with pytest.raises(Exception) as e_info:
+        AsyncScrapinghubLoader(job_ids=['123/4/5'])
+
+    assert 'Pass scrapinghub client or set SH_APIKEY env' in str(e_info)
@@ -2,6 +2,7 @@ import numpy as np
 import pandas as pd
 import pytest
 
+from seller_stats.utils.sketches import QuantileSketch
 from seller_stats.utils.stats import get_distribution_thresholds
 
 
@@ -49,3 +50,54 @@ def test_distribution_thresholds_oneoffs():
 
     # предпоследняя отсечка меньше, чем максимально возможное значение изначального распределения
     assert thresholds[len(thresholds) - 2] <= 50000
+
+
+def test_quantile_sketch_rank_error():
+    data = np.random.default_rng(0).lognormal(7, 1, 100000)
+    sketch = QuantileSketch(seed=0)
+
+    for chunk in np.array_split(data, 25):
+        sketch.update(chunk)
+
+    data.sort()
+
+    assert sketch.count == 100000
+    assert sketch.quantile(0) == data[0]
+    assert sketch.quantile(1) == data[-1]
+    assert sum(len(level) for level in sketch.levels) < 1000
+
+    for q in [.05, .25, .5, .75, .95, .99]:
+        assert abs(np.searchsorted(data, sketch.quantile(q)) / len(data) - q) < 3.3 / sketch.k
+
+
+def test_quantile_sketch_merge():
+    data = np.random.default_rng(1).uniform(0, 1000, 50000)
+
+    sketch = QuantileSketch(seed=1).update(data[:20000]).merge(QuantileSketch(seed=2).update(data[20000:]))
+
+    assert sketch.count == 50000
+    assert abs(np.searchsorted(np.sort(data), sketch.quantile(.95)) / len(data) - .95) < 3.3 / sketch.k
+
+
+def test_quantile_sketch_merge_different_sizes():
+    with pytest.raises(ValueError):
+        QuantileSketch(k=100).merge(QuantileSketch(k=200))
+
+
+def test_quantile_sketch_skips_nan():
+    sketch = QuantileSketch().update([1, np.nan, 3])
+
+    assert sketch.count == 2
+    assert np.isnan(QuantileSketch().quantile(.5))
+
+
+@pytest.mark.parametrize('mock_data', [
+    (1, 450, 1294, 2455, 3964, 4345),
+    (345, 678),
+    (123, 222, 359, 486),
+])
+def test_distribution_thresholds_from_sketch(mock_data):
+    series = pd.Series(data=mock_data)
+    sketch = QuantileSketch().update(series)
+
+    assert get_distribution_thresholds(sketch) == get_distribution_thresholds(series)
@@ -1,3 +1,5 @@
+import pandas as pd
+import pyarrow as pa
 import pytest
 
 from seller_stats.utils.transformers import (EmptyTransformer, Transformer, WildsearchCrawlerOzonTransformer,
@@ -105,3 +107,38 @@ def test_empty_transformer(sample_abstract_item):
     assert transformed['one_one'] == 'value_1'
     assert transformed['two_two'] == 'value_2'
     assert transformed['four_four'] == 'value_4'
+
+
+@pytest.mark.parametrize('transformer, item_fixture', [
+    [WildsearchCrawlerWildberriesTransformer(), 'sample_wb_item'],
+    [WildsearchCrawlerOzonTransformer(), 'sample_ozon_item'],
+    [MpstatsWildbserriesTransformer(), 'sample_mpstats_item'],
+    [Transformer(drop_keys=['two_two']), 'sample_abstract_item'],
+    [EmptyTransformer(drop_keys=['two_two']), 'sample_abstract_item'],
+])
+def test_transform_frame_matches_transform_item(transformer, item_fixture, request):
+    item = request.getfixturevalue(item_fixture)
+    df = pd.DataFrame(data=[item])
+
+    transformed_item = transformer.transform_item(dict(item))
+    transformed_df = transformer.transform_frame(df)
+
+    assert sorted(transformed_df.columns) == sorted(transformed_item.keys())
+
+
+def test_transform_frame_overwrites_existing_column():
+    df = pd.DataFrame(data=[{'one_one': 'new', 'one': 'old'}])
+
+    transformed = Transformer(transform_rules={'one_one': 'one'}).transform_frame(df)
+
+    assert list(transformed.columns) == ['one']
+    assert transformed.loc[0, 'one'] == 'new'
+
+
+def test_transform_frame_arrow_table(sample_abstract_item):
+    table = pa.Table.from_pylist([sample_abstract_item])
+
+    transformed = Transformer(transform_rules={'one_one': 'one'}, drop_keys=['four_four']).transform_frame(table)
+
+    assert type(transformed) is pa.Table
+    assert transformed.column_names == ['one', 'two_two']